@@ -1,39 +1,58 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import io
-import numpy as np
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import ResultCache, content_key, derived_key
+from classification import DEFAULT_THRESHOLDS, Thresholds
+from dashboard import (
+    LF_BIN, STATUS_COLORS, cached_rollup, date_figure, date_totals, filter_rollup, lf_distribution,
+    lf_distribution_figure, route_figure, route_totals, status_mix, status_mix_figure,
+)
+from diagnostics import StageLog, configure_logging
+from export import EXPORT_FORMATS, cached_report, report_file_name
+from pipeline import PipelineError, compare_statuses, load_workbooks, prepare_result, reclassify
+from review import CHECK_COLUMN, apply_review_edits, init_review_state
+from snapshots import SnapshotStore
+from table_view import filter_result, highlight_status_rows, page_controls, results_page_frame, sort_controls, sorted_page
 
 # ----------------------- PAGE CONFIG -----------------------
 st.set_page_config(page_title="Анализ темпов продаж", page_icon="📈", layout="wide")
 st.title("📈 Анализ темпа продаж по рейсам by Kirill")
-
-# ----------------------- HELPERS ---------------------------
-def clean_number(s: pd.Series) -> pd.Series:
-    """Парсит числа: убирает пробелы/неразрывные пробелы, заменяет запятую на точку, возвращает float."""
-    return pd.to_numeric(
-        s.astype(str)
-         .str.replace('\u00a0','', regex=False)
-         .str.replace(' ','', regex=False)
-         .str.replace(',','.', regex=False),
-        errors='coerce'
-    )
-
-def clean_percent(s: pd.Series) -> pd.Series:
-    """Парсит проценты: снимает %, чистит разделители и масштабирует при необходимости (0..1 -> *100)."""
-    val = pd.to_numeric(
-        s.astype(str)
-         .str.replace('%','', regex=False)
-         .str.replace('\u00a0','', regex=False)
-         .str.replace(' ','', regex=False)
-         .str.replace(',','.', regex=False),
-        errors='coerce'
-    )
-    # Если среднее по столбцу похоже на долю (например 0.92), домножаем на 100.
-    # Порог 2 работает устойчиво и к редким аномалиям.
-    if val.mean(skipna=True) < 2:
-        val = val * 100
-    return val
+configure_logging()
+EXPORT_LOG_SIZE = 50   # замеров выгрузок в журнале сессии
+
+# ----------------------- CACHE -----------------------------
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    """Общий для всех сессий LRU-кэш подготовленных данных: фильтры не перечитывают файл."""
+    return ResultCache(max_entries=8)
+
+@st.cache_resource
+def get_worker_pool() -> ProcessPoolExecutor | None:
+    """Пул процессов для чтения нескольких выгрузок; на одном ядре читаем последовательно."""
+    workers = os.cpu_count() or 1
+    if workers == 1:
+        return None
+    # spawn, а не fork: сервер Streamlit многопоточный
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+@st.cache_resource
+def get_export_cache() -> ResultCache:
+    """Готовые файлы отчётов по наборам данных и форматам."""
+    return ResultCache(max_entries=8)
+
+@st.cache_resource
+def get_rollup_cache() -> ResultCache:
+    """Кубы агрегатов для дашборда по наборам данных."""
+    return ResultCache(max_entries=8)
+
+@st.cache_resource
+def get_snapshot_store() -> SnapshotStore:
+    """Хранилище снимков; держим один экземпляр, чтобы не перечитывать индексы row group."""
+    return SnapshotStore()
 
 # ----------------------- UI: INSTRUCTIONS ------------------
 with st.expander("ℹ️ ИНСТРУКЦИЯ ПО ИСПОЛЬЗОВАНИЮ И ЛОГИКЕ АНАЛИЗА"):
@@ -61,6 +80,8 @@ with st.expander("ℹ️ ИНСТРУКЦИЯ ПО ИСПОЛЬЗОВАНИЮ И
 
     3. **🔴 Отстаём** — во всех остальных случаях значимого недовыполнения.
 
+    Пороги (3, 10, 90%, 30 дней, 4, 5, 0.3) можно поменять в блоке «🎛 Пороги классификации» — статусы пересчитаются сразу.
+
     ### 📊 РАСЧЁТНЫЕ ПОКАЗАТЕЛИ:
     - **days_to_flight** — дни до вылета (мин. 1)
     - **sold_total** = `Cap - Av seats`  ← учитывает жёсткие блоки
@@ -86,168 +107,102 @@ with st.expander("📁 ФОРМАТ ЗАГРУЖАЕМОГО EXCEL-ФАЙЛА"):
 
     ### Для анализа используются:
     - **`flt_date&num`**, **`Cap`**, **`Av seats`**, **`Ind SS`**, **`Ind SS yesterday`**, **`LF`**
+
+    ### Несколько файлов:
+    - Можно загрузить сразу несколько выгрузок (например, по хабам и перевозчикам) — они объединяются в одну сеть
+    - Если рейс (`flt_date&num`) есть в нескольких файлах, берётся строка из первого по порядку загрузки
     """)
 
-uploaded_file = st.file_uploader("Загрузи Excel файл", type=["xlsx"])
+uploaded_files = st.file_uploader("Загрузи Excel файлы", type=["xlsx"], accept_multiple_files=True)
 
-if uploaded_file:
+if uploaded_files:
     try:
-        df = pd.read_excel(uploaded_file, engine="openpyxl")
-        if df.empty:
-            st.error("❌ Файл пустой")
-            st.stop()
-
-        # ---------- Rename ----------
-        df = df.rename(columns={
-            'flt_date&num': 'flight',
-            'Ind SS': 'sold_total_raw',          # как в файле (без блоков), дальше не используем в расчётах
-            'Ind SS yesterday': 'sold_yesterday',
-            'Cap': 'total_seats',
-            'LF': 'load_factor',
-        })
-
-        required_columns = ['flight','sold_total_raw','sold_yesterday','total_seats','load_factor','Av seats']
-        missing_columns = [c for c in required_columns if c not in df.columns]
-        if missing_columns:
-            st.error(f"❌ Отсутствуют обязательные колонки: {', '.join(missing_columns)}")
-            st.write("📋 Найденные колонки:", df.columns.tolist())
-            st.stop()
+        # ---------- Load & prepare (cached by content hash + analysis date) ----------
+        today = datetime.today().date()
+        files = [(f.name, f.getvalue()) for f in uploaded_files]
+        cache_key = content_key([data for _, data in files], today)
+        result_cache = get_result_cache()
+        prepared = result_cache.get(cache_key)
+        if prepared is None:
+            try:
+                # Файлы читаются параллельно, классификация — один раз по объединённым данным
+                # Замеры этапов пишутся в лог и хранятся вместе с данными для панели диагностики
+                stage_log = StageLog(upload=cache_key[0][:12], files=len(files))
+                with stage_log.track('read') as record:
+                    merged, merge_notices = load_workbooks(files, get_worker_pool())
+                    record.rows_out = len(merged)
+                prepared = prepare_result(merged, today, stage_log)
+                prepared.notices[:0] = merge_notices
+            except PipelineError as e:
+                st.error(str(e))
+                if e.found_columns is not None:
+                    st.write("📋 Найденные колонки:", e.found_columns)
+                st.stop()
+            result_cache.put(cache_key, prepared)
 
         st.write("📊 Первые 5 строк исходных данных:")
-        st.dataframe(df.head())
-
-        # ---------- Split "flight" ----------
-        flight_split = df['flight'].str.split(" - ", n=2, expand=True)
-        if flight_split.shape[1] < 3:
-            st.error("❌ Неверный формат 'flt_date&num'. Ожидается: 'YYYY.MM.DD - XX123 - ROUTE'")
-            st.stop()
-        df[['flight_date_str','flight_number','route']] = flight_split.iloc[:, :3]
-
-        # ---------- Dates ----------
-        original_count = len(df)
-        df['flight_date'] = pd.to_datetime(df['flight_date_str'], format="%Y.%m.%d", errors='coerce')
-        invalid_dates = df['flight_date'].isna().sum()
-        if invalid_dates > 0:
-            st.warning(f"⚠️ Найдено {invalid_dates} строк с некорректной датой. Они будут исключены.")
-            df = df[df['flight_date'].notna()].copy()
-        if df.empty:
-            st.error("❌ После обработки дат не осталось корректных записей")
-            st.stop()
-        st.success(f"✅ Обработано {len(df)} из {original_count} записей")
-
-        # ---------- Clean numbers (vectorized) ----------
-        df['total_seats']     = clean_number(df['total_seats'])
-        df['sold_total_raw']  = clean_number(df['sold_total_raw']).fillna(0)  # инфо-колонка, в расчётах не используется
-        df['sold_yesterday']  = clean_number(df['sold_yesterday']).fillna(0)
-        df['av_seats']        = clean_number(df['Av seats'])  # оставляем NaN для контроля
-        df['load_factor_num'] = clean_percent(df['load_factor']).fillna(0)   # ✅ всегда 0..100
-
-        # ---------- Require Av seats ----------
-        if df['av_seats'].isna().any():
-            missing = int(df['av_seats'].isna().sum())
-            st.warning(f"⚠️ У {missing} строк нет 'Av seats' — они исключены (нужно для учёта блоков).")
-            df = df[df['av_seats'].notna()].copy()
-        if df.empty:
-            st.error("❌ После исключения строк без 'Av seats' не осталось данных")
-            st.stop()
-
-        # ---------- Analysis date ----------
-        today = datetime.today().date()
-        df['days_to_flight'] = df['flight_date'].apply(lambda x: max((x.date() - today).days, 1))
-
-        # Убираем уже вылетевшие
-        past_flights = df[df['flight_date'].dt.date < today]
-        if not past_flights.empty:
-            st.warning(f"⚠️ Найдено {len(past_flights)} рейсов, которые уже вылетели. Они будут исключены.")
-            df = df[df['flight_date'].dt.date >= today].copy()
-        if df.empty:
-            st.error("❌ После исключения вылетевших рейсов не осталось записей")
-            st.stop()
-
-        # ---------- NEW sold_total & remaining ----------
-        # sold_total включает жёсткие блоки: Cap - Av seats
-        df['sold_total']      = (df['total_seats'] - df['av_seats']).clip(lower=0)
-        # остаток мест равен Av seats
-        df['remaining_seats'] = df['av_seats'].clip(lower=0)
-
-        # ---------- Daily plan & diffs ----------
-        df['daily_needed'] = np.where(
-            (df['days_to_flight'] > 0) & (df['remaining_seats'] > 0),
-            df['remaining_seats'] / df['days_to_flight'],
-            0
-        )
-        df['diff_vs_plan'] = df['sold_yesterday'] - df['daily_needed']
-
-        # ---------- Classification (УПРОЩЕННАЯ ЛОГИКА - БЕЗ "ДАЛЕКО ДО РЕЙСА") ----------
-        def classify(row):
-            days_to_flight = row['days_to_flight']
-            daily_needed = row['daily_needed']
-            diff = row['diff_vs_plan']
-            load_factor = row['load_factor_num']
-            sold_yesterday = row['sold_yesterday']
-            
-            # 1. Перепродажа для малых планов с огромными продажами
-            if daily_needed < 3 and diff > 10:
-                return "🔵 Перепродажа"
-            
-            # 2. Полный рейс
-            if sold_yesterday == 0 and load_factor > 90:
-                return "🟢 По плану"
-            
-            # 3. Малый план
-            if daily_needed < 3:
-                return "🟢 По плану"
-            
-            # 4. Далёкие рейсы с малым планом - ТЕПЕРЬ "ПО ПЛАНУ"
-            if days_to_flight > 30 and daily_needed < 4:
-                if sold_yesterday > daily_needed:
-                    return "🔵 Перепродажа"
-                else:
-                    return "🟢 По плану"  # ВСЕ остальные случаи - по плану
-            
-            # 5. Основная классификация
-            if diff > max(5, daily_needed * 0.3):
-                return "🔵 Перепродажа"
-            elif abs(diff) <= max(5, daily_needed * 0.3):
-                return "🟢 По плану"
+        st.dataframe(prepared.preview)
+        for level, message in prepared.notices:
+            getattr(st, level)(message)
+
+        result = prepared.result
+        run_log = StageLog(upload=cache_key[0][:12], scope="page")
+
+        # ----------------------- THRESHOLDS (WHAT-IF) -----------------------
+        # Пороги меняют только классификацию: она пересчитывается по сохранённым входам, без чтения и очистки файла
+        threshold_labels = {
+            'small_plan': "Малый план: daily_needed <",
+            'small_plan_oversell': "Малый план → перепродажа при diff >",
+            'full_load_factor': "Полный рейс: LF >, %",
+            'far_days': "Далёкий рейс: дней до вылета >",
+            'far_small_plan': "Далёкий рейс: daily_needed <",
+            'tolerance_min': "Допуск по отклонению, не меньше",
+            'tolerance_share': "Допуск: доля от daily_needed",
+        }
+
+        def reset_thresholds():
+            for name in threshold_labels:
+                st.session_state.pop(f"threshold_{name}", None)
+
+        with st.expander("🎛 Пороги классификации (что если)"):
+            cols = st.columns(4)
+            values = {}
+            for i, (name, label) in enumerate(threshold_labels.items()):
+                default = float(getattr(DEFAULT_THRESHOLDS, name))
+                values[name] = cols[i % len(cols)].number_input(
+                    label, min_value=0.0, value=default, step=0.05 if default < 1 else 1.0, key=f"threshold_{name}"
+                )
+            st.button("↩️ Вернуть исходные пороги", on_click=reset_thresholds)
+            thresholds = Thresholds(**values)
+            if thresholds == DEFAULT_THRESHOLDS:
+                st.caption("Действуют исходные пороги — измените любой, чтобы сравнить статусы «было → стало».")
             else:
-                return "🔴 Отстаём"
-
-        df['status'] = df.apply(classify, axis=1)
-
-        # ---------- Result set ----------
-        result_columns = [
-            'flight', 'flight_date', 'flight_number', 'route',
-            'total_seats', 'sold_total', 'sold_yesterday',
-            'remaining_seats', 'days_to_flight', 'daily_needed',
-            'diff_vs_plan', 'load_factor_num', 'status'
-        ]
-        result = df[result_columns].copy()
-
-        # ---------- Formatting ----------
-        result['daily_needed']     = result['daily_needed'].fillna(0).round(1)
-        result['diff_vs_plan']     = result['diff_vs_plan'].fillna(0).round(1)
-        result['sold_yesterday']   = result['sold_yesterday'].fillna(0).round(1)
-        result['load_factor_num']  = result['load_factor_num'].fillna(0).round(1)
-        result['sold_total']       = result['sold_total'].fillna(0).round(0).astype(int)
-        result['remaining_seats']  = result['remaining_seats'].fillna(0).round(0).astype(int)
+                with run_log.track('reclassify', len(result)) as record:
+                    status = reclassify(prepared, thresholds)
+                    comparison = compare_statuses(result['status'].array, status)
+                    record.rows_out = len(status)
+                st.dataframe(comparison)
+                st.caption(f"⏱ Пересчёт статусов и сравнение: {record.seconds * 1000:.1f} мс на {len(result):,} рейсов. "
+                           "Таблицы, графики и отчёты ниже — уже с новыми порогами.")
+                # Остальные колонки не копируются: assign с CoW меняет только status
+                result = result.assign(status=status)
+
+        # Кэши отчётов, куба и счётчики проверки — по набору данных вместе с порогами; дата анализа остаётся последней
+        dataset_key = cache_key if thresholds == DEFAULT_THRESHOLDS else derived_key(cache_key, thresholds)
 
         # ----------------------- SUMMARY HEADER -----------------------
         col1, col2 = st.columns([3, 1])
         with col1:
             st.subheader("📊 Результаты анализа темпа продаж")
         with col2:
+            # status — категория: статусы без рейсов в счётчики не попадают
             status_counts = result['status'].value_counts()
+            status_counts = status_counts[status_counts > 0]
             st.metric("Всего рейсов", len(result))
 
-        status_colors = {
-            "🔵 Перепродажа": "#1f77b4",
-            "🟢 По плану": "#2ca02c",
-            "🔴 Отстаём": "#d62728"
-        }
         cols = st.columns(len(status_counts))
         for i, (status, count) in enumerate(status_counts.items()):
-            color = status_colors.get(status, "#7f7f7f")
+            color = STATUS_COLORS.get(status, "#7f7f7f")
             cols[i].markdown(
                 f"<div style='background-color:{color}; padding:10px; border-radius:5px; color:white; text-align: center;'>"
                 f"<b>{status}</b><br>{count} рейсов</div>", 
@@ -274,136 +229,241 @@ if uploaded_file:
                 default=result['route'].unique()
             )
         with col4:
-            min_load = float(result['load_factor_num'].min())
-            max_load = float(result['load_factor_num'].max())
+            # load_factor_num во float32 — границы округляем до 0.1, как в данных, без хвостов 12.300000190734863
+            min_load = round(float(result['load_factor_num'].min()), 1)
+            max_load = round(float(result['load_factor_num'].max()), 1)
             load_factor_range = st.slider("Load Factor (%)", min_load, max_load, (min_load, max_load))
 
-        filtered_result = result[
-            (result['status'].isin(selected_status)) &
-            (result['days_to_flight'].between(days_range[0], days_range[1])) &
-            (result['route'].isin(routes)) &
-            (result['load_factor_num'].between(load_factor_range[0], load_factor_range[1]))
-        ]
-
-        # ----------------------- TABLE STYLING -----------------------
-        def highlight_rows(row):
-            if row['status'] == '🔴 Отстаём':
-                return ['background-color: #ffcccc'] * len(row)
-            elif row['status'] == '🔵 Перепродажа':
-                return ['background-color: #ccffcc'] * len(row)
-            else:
-                return [''] * len(row)
-
-        display_columns = [
-            'flight', 'flight_date', 'flight_number', 'route', 
-            'total_seats', 'sold_total', 'sold_yesterday', 
-            'remaining_seats', 'days_to_flight', 'daily_needed', 
-            'diff_vs_plan', 'load_factor_num', 'status'
-        ]
-        formatted_result = filtered_result[display_columns].copy()
-
-        # Приведём форматы к красивому виду в UI
-        display_df = formatted_result.copy()
-        # ✅ Изменено: формат даты на ДД.ММ.ГГГГ
-        display_df['flight_date'] = display_df['flight_date'].dt.strftime('%d.%m.%Y')
-        display_df['daily_needed'] = display_df['daily_needed'].apply(lambda x: f"{x:.1f}" if pd.notna(x) else "0.0")
-        display_df['diff_vs_plan'] = display_df['diff_vs_plan'].apply(lambda x: f"{x:.1f}" if pd.notna(x) else "0.0")
-        display_df['sold_yesterday'] = display_df['sold_yesterday'].apply(lambda x: f"{x:.1f}" if pd.notna(x) else "0.0")
-        # ✅ load_factor как 100%
-        display_df['load_factor'] = display_df['load_factor_num'].apply(lambda x: f"{round(x):.0f}%")
-        display_df = display_df.drop(columns=['load_factor_num'])
-
-        st.dataframe(
-            display_df.style.apply(highlight_rows, axis=1),
-            use_container_width=True,
-            height=420
-        )
+        filtered_result = run_log.run('filter', filter_result, result, selected_status, days_range, routes, load_factor_range)
+
+        # ----------------------- DASHBOARD -----------------------
+        # Куб агрегатов строится один раз на набор данных; при смене фильтров фильтруется и сворачивается только он
+        with st.expander("📊 Сводка по маршрутам и датам вылета", expanded=True):
+            with run_log.track('dashboard', len(result)) as record:
+                cube = filter_rollup(cached_rollup(get_rollup_cache(), dataset_key, result),
+                                     filtered_result, selected_status, days_range, routes,
+                                     load_factor_range != (min_load, max_load))
+                record.rows_out = len(cube)
+                if filtered_result.empty:
+                    st.info("ℹ️ Под выбранные фильтры не попал ни один рейс.")
+                else:
+                    c1, c2 = st.columns(2)
+                    c1.plotly_chart(status_mix_figure(status_mix(cube)), key="dashboard_status")
+                    c2.plotly_chart(lf_distribution_figure(lf_distribution(cube)), key="dashboard_lf")
+                    st.plotly_chart(date_figure(*date_totals(cube)), key="dashboard_dates")
+                    st.plotly_chart(route_figure(route_totals(cube)), key="dashboard_routes")
+                    st.caption(f"Распределение Load Factor — по корзинам с шагом {LF_BIN}%.")
+
+        # ----------------------- TABLE -----------------------
+        # Сортировка и постраничный вывод на сервере: в браузер уходит только видимая страница,
+        # result при этом не копируется и не меняется
+        table_sort_options = {
+            "Дата вылета": 'flight_date',
+            "Рейс": 'flight',
+            "Маршрут": 'route',
+            "Дней до вылета": 'days_to_flight',
+            "Необходимый темп": 'daily_needed',
+            "Отклонение": 'diff_vs_plan',
+            "Продано вчера": 'sold_yesterday',
+            "Load Factor": 'load_factor_num',
+            "Статус": 'status',
+        }
+        search = st.text_input("Поиск по рейсу", placeholder="например, SU123 или MOW-AER")
+        table_df = filtered_result
+        if search:
+            table_df = table_df[table_df['flight'].str.contains(search.strip(), case=False, regex=False, na=False)]
+        sort_by, ascending = sort_controls("results", table_sort_options, "Дата вылета")
+        rows = page_controls("results", len(table_df), default_size=100)
+        page_df = run_log.run('sort/page', sorted_page, table_df, sort_by, ascending, rows)
+
+        display_df = results_page_frame(page_df)
+
+        # Числа форматируются в браузере через column_config, а не строками в Python
+        with run_log.track('style', len(display_df)):
+            st.dataframe(
+                display_df.style.apply(highlight_status_rows, axis=None),
+                width="stretch",
+                height=420,
+                column_config={
+                    'sold_yesterday': st.column_config.NumberColumn(format="%.1f"),
+                    'daily_needed': st.column_config.NumberColumn(format="%.1f"),
+                    'diff_vs_plan': st.column_config.NumberColumn(format="%.1f"),
+                    # ✅ load_factor как 100%
+                    'load_factor': st.column_config.NumberColumn(format="%.0f%%"),
+                },
+            )
 
         # ----------------------- ATTENTION BLOCK -----------------------
         attention_df = filtered_result[filtered_result['status'].isin(["🔴 Отстаём", "🔵 Перепродажа"])]
         if not attention_df.empty:
             st.subheader("⚠️ Рейсы, требующие внимания")
-
-            if 'checked_flights' not in st.session_state:
-                st.session_state.checked_flights = {}
+            init_review_state(dataset_key, result)
+
+            attention_sort_options = {
+                "Отклонение": 'diff_vs_plan',
+                "Дата вылета": 'flight_date',
+                "Дней до вылета": 'days_to_flight',
+                "Необходимый темп": 'daily_needed',
+                "Продано вчера": 'sold_yesterday',
+                "Load Factor": 'load_factor_num',
+                "Маршрут": 'route',
+            }
 
             for status in ["🔴 Отстаём", "🔵 Перепродажа"]:
                 status_df = attention_df[attention_df['status'] == status]
                 if not status_df.empty:
-                    with st.expander(f"{status} ({len(status_df)} рейсов)"):
+                    with st.expander(f"{status} ({len(status_df)} рейсов по фильтрам)"):
                         st.info("✅ Отмечайте рейсы, которые уже проверили")
 
-                        for idx, row in status_df.iterrows():
-                            flight_key = row['flight']
-                            if flight_key not in st.session_state.checked_flights:
-                                st.session_state.checked_flights[flight_key] = False
-
-                            c1, c2 = st.columns([1, 10])
-                            with c1:
-                                is_checked = st.checkbox(
-                                    "",
-                                    value=st.session_state.checked_flights[flight_key],
-                                    key=f"check_{flight_key}",
-                                    help="Отметьте, если рейс уже проверен"
-                                )
-                                st.session_state.checked_flights[flight_key] = is_checked
-                            with c2:
-                                # ✅ Изменено: формат даты в названии рейса на ДД.ММ.ГГГГ
-                                flight_parts = row['flight'].split(' - ', 2)
-                                if len(flight_parts) >= 3:
-                                    # Преобразуем первую часть (дату) в нужный формат
-                                    try:
-                                        original_date = datetime.strptime(flight_parts[0], '%Y.%m.%d')
-                                        formatted_date = original_date.strftime('%d.%m.%Y')
-                                        formatted_flight = f"{formatted_date} - {flight_parts[1]} - {flight_parts[2]}"
-                                    except:
-                                        formatted_flight = row['flight']
-                                else:
-                                    formatted_flight = row['flight']
-                                
-                                st.markdown(f"~~{formatted_flight}~~ ✅" if is_checked else f"**{formatted_flight}**")
-                                st.markdown(f"""
-                                - **Маршрут:** {row['route']}
-                                - **Дата вылета:** {row['flight_date'].strftime('%d.%m.%Y')}
-                                - **Продано вчера:** {row['sold_yesterday']:.1f} 
-                                - **Необходимый темп:** {row['daily_needed']:.1f}
-                                - **Отклонение:** {row['diff_vs_plan']:.1f}
-                                - **Load Factor:** {round(row['load_factor_num']):.0f}%
-                                - **Дней до вылета:** {row['days_to_flight']}
-                                """)
-                            st.markdown("---")
-
-                        checked_count = sum(
-                            1 for key in st.session_state.checked_flights
-                            if st.session_state.checked_flights[key] and key in status_df['flight'].values
+                        # Рисуем только текущую страницу: один редактор вместо набора виджетов на каждый рейс
+                        sort_by, ascending = sort_controls(f"attention_{status}", attention_sort_options, "Отклонение")
+                        rows = page_controls(f"attention_{status}", len(status_df))
+                        page_df = sorted_page(status_df, sort_by, ascending, rows)
+
+                        # ✅ Изменено: формат даты в названии рейса на ДД.ММ.ГГГГ
+                        flight_label = (
+                            page_df['flight_date_display'].astype(str) + " - "
+                            + page_df['flight_number'].astype(str) + " - "
+                            + page_df['route'].astype(str)
+                        ).where(page_df['route'].notna(), page_df['flight'])
+                        editor_df = pd.DataFrame({
+                            CHECK_COLUMN: page_df['flight'].isin(st.session_state.checked_flights),
+                            "Рейс": flight_label,
+                            "Маршрут": page_df['route'],
+                            "Дата вылета": page_df['flight_date_display'],
+                            "Продано вчера": page_df['sold_yesterday'],
+                            "Необходимый темп": page_df['daily_needed'],
+                            "Отклонение": page_df['diff_vs_plan'],
+                            "Load Factor": page_df['load_factor_num'],
+                            "Дней до вылета": page_df['days_to_flight'],
+                        })
+                        editor_key = f"review_{status}_{st.session_state.review_version}"
+                        st.data_editor(
+                            editor_df,
+                            key=editor_key,
+                            hide_index=True,
+                            width="stretch",
+                            disabled=[c for c in editor_df.columns if c != CHECK_COLUMN],
+                            column_config={
+                                CHECK_COLUMN: st.column_config.CheckboxColumn(help="Отметьте, если рейс уже проверен"),
+                                "Продано вчера": st.column_config.NumberColumn(format="%.1f"),
+                                "Необходимый темп": st.column_config.NumberColumn(format="%.1f"),
+                                "Отклонение": st.column_config.NumberColumn(format="%.1f"),
+                                "Load Factor": st.column_config.NumberColumn(format="%.0f%%"),
+                            },
+                            on_change=apply_review_edits,
+                            args=(editor_key, page_df['flight'].tolist(), status),
                         )
-                        total_count = len(status_df)
+
+                        # Счётчик ведётся по всем рейсам статуса и обновляется только при отметках,
+                        # поэтому и подписан как счётчик по всей загрузке, а не по отфильтрованным рейсам
+                        checked_count = st.session_state.checked_counts.get(status, 0)
+                        total_count = int(status_counts.get(status, 0))
                         st.metric(
-                            f"Проверено рейсов ({status})", 
+                            f"Проверено рейсов ({status}, вся загрузка)",
                             f"{checked_count} из {total_count}",
-                            delta=f"{checked_count/total_count*100:.1f}%" if total_count > 0 else "0%"
+                            delta=f"{checked_count/total_count*100:.1f}%" if total_count > 0 else "0%",
+                            help="Считаются все рейсы статуса в загруженных файлах, без учёта фильтров",
                         )
 
-        # ----------------------- EXPORT TO EXCEL -----------------------
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            # Для Excel форматируем числа правильно и убираем NaN
-            result_to_export = result.copy()
-            # ✅ Изменено: формат даты на ДД.ММ.ГГГГ в экспорте
-            result_to_export['flight_date'] = result_to_export['flight_date'].dt.strftime('%d.%m.%Y')
-            result_to_export['daily_needed'] = result_to_export['daily_needed'].fillna(0).round(1)
-            result_to_export['diff_vs_plan'] = result_to_export['diff_vs_plan'].fillna(0).round(1)
-            result_to_export['sold_yesterday'] = result_to_export['sold_yesterday'].fillna(0).round(1)
-            result_to_export['load_factor'] = result_to_export['load_factor_num'].fillna(0).round(1)
-            result_to_export = result_to_export.drop('load_factor_num', axis=1)
-            result_to_export.to_excel(writer, index=False, sheet_name='Sales_Speed')
-            
-        st.download_button(
-            label="💾 Скачать полный отчёт в Excel",
-            data=output.getvalue(),
-            file_name=f"sales_speed_analysis_{today.strftime('%d.%m.%Y')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        # ----------------------- EXPORT -----------------------
+        # Отчёт собирается только по клику (callable в download_button) и кэшируется на набор данных
+        export_cache = get_export_cache()
+        # Выгрузка идёт по клику, уже после прогона. Журнал подготовки лежит в общем кэше и только читается,
+        # поэтому замеры выгрузок копятся в журнале сессии: последние EXPORT_LOG_SIZE, только по текущей загрузке
+        export_log = st.session_state.get('export_log')
+        if export_log is None or export_log.context['upload'] != cache_key[0][:12]:
+            export_log = StageLog(max_records=EXPORT_LOG_SIZE, upload=cache_key[0][:12], scope="export")
+            st.session_state.export_log = export_log
+
+        def export_report(fmt: str) -> bytes:
+            with export_log.track(f"export {fmt}", len(result)):
+                return cached_report(export_cache, dataset_key, result, fmt)
+
+        export_labels = {
+            'xlsx': "💾 Скачать полный отчёт в Excel",
+            'csv': "💾 CSV",
+            'parquet': "💾 Parquet",
+        }
+        for col, (fmt, label) in zip(st.columns([2, 1, 1, 4]), export_labels.items()):
+            with col:
+                st.download_button(
+                    label=label,
+                    data=lambda fmt=fmt: export_report(fmt),
+                    file_name=report_file_name(today, fmt),
+                    mime=EXPORT_FORMATS[fmt],
+                    on_click="ignore",
+                    key=f"export_{fmt}",
+                )
+
+        # ----------------------- HISTORY -----------------------
+        st.subheader("📈 Динамика темпа по снимкам")
+        snapshot_store = get_snapshot_store()
+        c1, c2 = st.columns([1, 3])
+        with c1:
+            # Повторное сохранение за тот же день добавляет только новые рейсы
+            if st.button("🗂 Сохранить снимок в историю"):
+                # В историю — статусы по исходным порогам, чтобы снимки разных дней были сравнимы
+                added = snapshot_store.append(today, prepared.result)
+                st.success(f"✅ Добавлено в историю рейсов: {added}")
+        snapshot_dates = snapshot_store.dates()
+        with c2:
+            if snapshot_dates:
+                st.caption(
+                    f"Снимков в истории: {len(snapshot_dates)} "
+                    f"({snapshot_dates[0].strftime('%d.%m.%Y')} — {snapshot_dates[-1].strftime('%d.%m.%Y')})"
+                )
+            else:
+                st.caption("История пока пуста — сохраните снимок, чтобы видеть динамику.")
+
+        if snapshot_dates:
+            c1, c2, c3 = st.columns([2, 2, 1])
+            with c1:
+                trend_routes = st.multiselect("Маршруты для динамики", options=filtered_result['route'].unique())
+            with c2:
+                trend_flights = st.multiselect(
+                    "Рейсы для динамики", options=filtered_result['flight'].unique(), max_selections=20
+                )
+            with c3:
+                period = st.date_input(
+                    "Период снимков", (snapshot_dates[0], snapshot_dates[-1]),
+                    min_value=snapshot_dates[0], max_value=snapshot_dates[-1], format="DD.MM.YYYY"
+                )
+
+            if (trend_flights or trend_routes) and len(period) == 2:
+                history = snapshot_store.query(
+                    flights=trend_flights or None,
+                    routes=trend_routes or None,
+                    start=period[0], end=period[1],
+                    columns=['flight', 'route', 'sold_yesterday', 'daily_needed', 'status'],
+                )
+                if history.empty:
+                    st.info("ℹ️ Для выбранных рейсов нет сохранённых снимков за этот период.")
+                else:
+                    # По рейсам — их темп, по маршрутам — суммарные продажи за вчера
+                    if trend_flights:
+                        pace = history.pivot_table(index='analysis_date', columns='flight', values='sold_yesterday')
+                    else:
+                        pace = history.groupby(['analysis_date', 'route'], observed=True)['sold_yesterday'].sum().unstack()
+                    st.write("Продано вчера по дням снимков:")
+                    st.line_chart(pace)
+                    st.write("Статусы по дням снимков:")
+                    st.bar_chart(history.groupby(['analysis_date', 'status']).size().unstack(fill_value=0))
+
+        # ----------------------- DIAGNOSTICS -----------------------
+        with st.expander("🩺 Диагностика: время и память по этапам"):
+            diagnostics_config = {
+                'seconds': st.column_config.NumberColumn("время, с", format="%.3f"),
+                'rows_in': st.column_config.NumberColumn("строк на входе"),
+                'rows_out': st.column_config.NumberColumn("строк на выходе"),
+                'memory_delta_mb': st.column_config.NumberColumn("Δ RSS, МБ", format="%.1f"),
+            }
+            st.caption("Подготовка данных (замер первой обработки; повторные прогоны берут данные из кэша)")
+            st.dataframe(prepared.stage_log.frame(), hide_index=True, column_config=diagnostics_config)
+            st.caption("Текущий прогон страницы")
+            st.dataframe(run_log.frame(), hide_index=True, column_config=diagnostics_config)
+            st.caption(f"Выгрузки отчётов в этой сессии (последние {EXPORT_LOG_SIZE})")
+            st.dataframe(export_log.frame(), hide_index=True, column_config=diagnostics_config)
 
     except Exception as e:
         st.error(f"❌ Ошибка при обработке файла: {str(e)}")
@@ -412,5 +472,5 @@ if uploaded_file:
         st.info("ℹ️ Пожалуйста, проверьте формат файла и попробуйте снова.")
 
 else:
-    st.info("⬆️ Загрузите Excel файл, чтобы начать анализ.")
+    st.info("⬆️ Загрузите Excel файлы, чтобы начать анализ.")
 
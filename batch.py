@@ -0,0 +1,100 @@
+"""Пакетный анализ папки с ежедневными выгрузками без браузера.
+
+Каждый файл обрабатывается в отдельном процессе, рядом пишется его отчёт,
+а в конце — общая сводка summary.csv по всем файлам.
+
+Пример:  python batch.py exports/ --out reports/ --format xlsx parquet --workers 8
+Архив за прошлые дни в историю снимков:  python batch.py exports/2024-01-15/ --date 2024-01-15 --snapshots
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+from classification import STATUSES
+from export import EXPORT_FORMATS, build_report
+from pipeline import PipelineError, analyze_file
+from snapshots import SNAPSHOT_DIR, SnapshotStore
+
+
+def process_file(path: Path, out_dir: Path, formats: list, today: date, keep_result: bool = False) -> tuple:
+    """Анализирует один файл и пишет отчёты; возвращает строку сводки и (по запросу) result для истории."""
+    summary = {'file': path.name, 'ok': False, 'flights': 0, **{s: 0 for s in STATUSES}, 'message': ''}
+    try:
+        prepared = analyze_file(path, today)
+    except PipelineError as e:
+        summary['message'] = str(e)
+        return summary, None
+    except Exception as e:  # битый файл не должен останавливать всю пачку
+        summary['message'] = f"❌ Ошибка при обработке файла: {e}"
+        return summary, None
+
+    result = prepared.result
+    for fmt in formats:
+        (out_dir / f"{path.stem}_sales_speed.{fmt}").write_bytes(build_report(result, fmt))
+    summary.update(result['status'].value_counts().to_dict())
+    summary.update(ok=True, flights=len(result), message=" ".join(text for _, text in prepared.notices))
+    return summary, (result if keep_result else None)
+
+
+def run_batch(input_dir: Path, out_dir: Path, formats: list, today: date,
+              pattern: str = "*.xlsx", workers: int | None = None,
+              store: SnapshotStore | None = None) -> pd.DataFrame:
+    """Обрабатывает все файлы папки пулом процессов и пишет сводку summary.csv; возвращает её же.
+
+    Со store результаты ещё и дописываются в историю снимков — из основного процесса, по одному.
+    """
+    # "~$..." — служебные lock-файлы открытых в Excel книг
+    files = sorted(p for p in input_dir.glob(pattern) if not p.name.startswith("~$"))
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(process_file, path, out_dir, formats, today, store is not None): path
+            for path in files
+        }
+        for future in as_completed(futures):
+            row, result = future.result()
+            if result is not None:
+                store.append(today, result)
+            rows.append(row)
+            state = f"{row['flights']} рейсов" if row['ok'] else row['message']
+            print(f"{'✅' if row['ok'] else '❌'} {row['file']}: {state}", flush=True)
+
+    summary = pd.DataFrame(rows, columns=['file', 'ok', 'flights', *STATUSES, 'message'])
+    summary = summary.sort_values('file', ignore_index=True)
+    summary.to_csv(out_dir / "summary.csv", index=False)
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Пакетный анализ темпа продаж по папке Excel-выгрузок")
+    parser.add_argument('input_dir', type=Path, help="папка с выгрузками")
+    parser.add_argument('--out', type=Path, default=Path("reports"), help="куда писать отчёты (по умолчанию reports/)")
+    parser.add_argument('--format', nargs='+', choices=list(EXPORT_FORMATS), default=['xlsx'], dest='formats')
+    parser.add_argument('--pattern', default="*.xlsx", help="маска файлов (по умолчанию *.xlsx)")
+    parser.add_argument('--workers', type=int, default=None, help=f"число процессов (по умолчанию {os.cpu_count()})")
+    parser.add_argument('--date', type=date.fromisoformat, default=None,
+                        help="дата анализа YYYY-MM-DD (по умолчанию сегодня)")
+    parser.add_argument('--snapshots', type=Path, nargs='?', const=SNAPSHOT_DIR, default=None,
+                        help=f"дописать результаты в историю снимков (по умолчанию {SNAPSHOT_DIR})")
+    args = parser.parse_args(argv)
+
+    if not args.input_dir.is_dir():
+        parser.error(f"папка не найдена: {args.input_dir}")
+    today = args.date or datetime.today().date()
+    store = SnapshotStore(args.snapshots) if args.snapshots else None
+    summary = run_batch(args.input_dir, args.out, args.formats, today, args.pattern, args.workers, store)
+
+    failed = int((~summary['ok']).sum())
+    print(f"Готово: {len(summary) - failed} из {len(summary)} файлов, сводка: {args.out / 'summary.csv'}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
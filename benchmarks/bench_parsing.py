@@ -0,0 +1,90 @@
+"""Микро-бенчмарк парсеров чисел: прежние clean_number/clean_percent против parsing.py.
+
+Запуск из корня репозитория:  python benchmarks/bench_parsing.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsing import clean_number, clean_percent  # noqa: E402
+
+
+# ----------------------- LEGACY ----------------------------
+def legacy_clean_number(s: pd.Series) -> pd.Series:
+    """Прежняя реализация: astype(str) и цепочка .str.replace для любой колонки."""
+    return pd.to_numeric(
+        s.astype(str)
+         .str.replace('\u00a0','', regex=False)
+         .str.replace(' ','', regex=False)
+         .str.replace(',','.', regex=False),
+        errors='coerce'
+    )
+
+def legacy_clean_percent(s: pd.Series) -> pd.Series:
+    """Прежняя реализация clean_percent."""
+    val = pd.to_numeric(
+        s.astype(str)
+         .str.replace('%','', regex=False)
+         .str.replace('\u00a0','', regex=False)
+         .str.replace(' ','', regex=False)
+         .str.replace(',','.', regex=False),
+        errors='coerce'
+    )
+    if val.mean(skipna=True) < 2:
+        val = val * 100
+    return val
+
+
+# ----------------------- CASES -----------------------------
+def make_cases(rows: int, seed: int = 0) -> dict:
+    """Колонки в тех форматах, что встречаются в выгрузках."""
+    rng = np.random.default_rng(seed)
+    seats = rng.integers(0, 20000, rows)
+    share = rng.random(rows)
+    messy = pd.Series([f"{x:,}".replace(',', ' ') for x in seats], dtype=object)
+    messy[::97] = "н/д"
+    mixed = pd.Series(seats.astype(object))
+    mixed[::3] = [f"{x:,}".replace(',', ' ') for x in seats[::3]]
+    return {
+        'number: int64':             (pd.Series(seats), clean_number, legacy_clean_number),
+        'number: float64':           (pd.Series(seats * 1.0), clean_number, legacy_clean_number),
+        'number: NBSP strings':      (messy, clean_number, legacy_clean_number),
+        'number: mixed object':      (mixed, clean_number, legacy_clean_number),
+        'percent: 0..1 float':       (pd.Series(share), clean_percent, legacy_clean_percent),
+        'percent: "98,7%" strings':  (pd.Series([f"{x:.1f}%".replace('.', ',') for x in share * 100], dtype=object),
+                                      clean_percent, legacy_clean_percent),
+    }
+
+
+def best_of(func, s: pd.Series, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(s)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"rows={args.rows:,} repeat={args.repeat} (лучшее время, с)")
+    print(f"{'case':<28}{'legacy':>10}{'new':>10}{'speedup':>10}")
+    for name, (s, new, legacy) in make_cases(args.rows).items():
+        pd.testing.assert_series_equal(new(s), legacy(s), check_dtype=False, check_names=False)
+        t_legacy = best_of(legacy, s, args.repeat)
+        t_new = best_of(new, s, args.repeat)
+        print(f"{name:<28}{t_legacy:>10.3f}{t_new:>10.3f}{t_legacy / t_new:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Бенчмарк этапов анализа: чтение, этапы prepare_result, фильтр, дашборд, стилизация таблицы и экспорт.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_pipeline.py --rows 100000 --memory --json bench.json
+    python benchmarks/bench_pipeline.py --rows 100000 --compare bench.json   # сравнение с прошлым коммитом
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dashboard import (  # noqa: E402
+    build_rollup, date_figure, date_totals, filter_rollup, lf_distribution, lf_distribution_figure, route_figure,
+    route_totals, status_mix, status_mix_figure,
+)
+from export import EXPORT_FORMATS, build_report  # noqa: E402
+from generate_data import LF_FORMATS, ensure_export  # noqa: E402
+from diagnostics import StageLog  # noqa: E402
+from pipeline import load_workbook, prepare_result  # noqa: E402
+from table_view import filter_result, highlight_status_rows, results_page_frame  # noqa: E402
+
+STYLE_PAGE_ROWS = 100   # столько строк за раз стилизует основная таблица в приложении
+
+
+def _rows(value) -> int | None:
+    """Число строк для таблиц; у HTML и байтов отчёта строк нет."""
+    return len(value) if hasattr(value, 'columns') else None
+
+
+def _cell(value, spec: str, width: int = 10) -> str:
+    """Ячейка отчёта шириной width; пустое значение — прочерк."""
+    return (format(value, spec) if value is not None else '—').rjust(width)
+
+
+def measure(func, arg, memory: bool) -> tuple:
+    """Выполняет func(arg): (результат, секунды, пик памяти в МБ или None)."""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    value = func(arg)
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return value, seconds, peak
+
+
+def _dashboard_figures(cube) -> list:
+    return [status_mix_figure(status_mix(cube)), lf_distribution_figure(lf_distribution(cube)),
+            date_figure(*date_totals(cube)), route_figure(route_totals(cube))]
+
+
+def run_stages(path: Path, today: date, memory: bool) -> tuple:
+    """Один прогон всех этапов: ([{stage, seconds, rows_in, rows_out, peak_mb}, ...], пик памяти prepare_result в МБ).
+
+    Подготовка идёт через тот же prepare_result, что и в приложении, а этапы берутся из его StageLog;
+    пик памяти по отдельным этапам внутри prepare_result не замеряется — только по всей подготовке.
+    """
+    records = []
+
+    def step(name, func, arg):
+        value, seconds, peak = measure(func, arg, memory)
+        records.append({'stage': name, 'seconds': seconds, 'rows_in': _rows(arg),
+                        'rows_out': _rows(value), 'peak_mb': peak})
+        return value
+
+    df = step('read', load_workbook, path)
+    stage_log = StageLog()
+    prepared, _, prepare_peak = measure(lambda frame: prepare_result(frame, today, stage_log), df, memory)
+    records.extend({'stage': r.stage, 'seconds': r.seconds, 'rows_in': r.rows_in, 'rows_out': r.rows_out,
+                    'peak_mb': None} for r in stage_log.records)
+    result = prepared.result
+
+    # Фильтр с настройками по умолчанию из блока «🔍 Фильтры» (всё включено)
+    filters = (result['status'].unique(), (result['days_to_flight'].min(), result['days_to_flight'].max()),
+               result['route'].unique(), (0.0, 100.0))
+    filtered = step('filter', lambda r: filter_result(r, *filters), result)
+    cube = step('rollup', build_rollup, result)
+    # диапазон LF не сужен — графики строятся по кубу, без перебора рейсов
+    step('dashboard', lambda c: [fig.to_json() for fig in _dashboard_figures(
+        filter_rollup(c, filtered, *filters[:3], False))], cube)
+    step('style', lambda r: results_page_frame(r.head(STYLE_PAGE_ROWS))
+         .style.apply(highlight_status_rows, axis=None).to_html(), filtered)
+    for fmt in EXPORT_FORMATS:
+        step(f'export {fmt}', lambda r, fmt=fmt: build_report(r, fmt), filtered)
+    return records, prepare_peak
+
+
+def best_of(runs: list) -> list:
+    """Лучшее время по каждому этапу среди повторов (пик памяти — из того же прогона)."""
+    return [min(stage_runs, key=lambda r: r['seconds']) for stage_runs in zip(*runs)]
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(records: list, baseline: dict | None):
+    base = {r['stage']: r['seconds'] for r in baseline['stages']} if baseline else {}
+    total = {'stage': 'total', 'seconds': sum(r['seconds'] for r in records),
+             'rows_in': records[0]['rows_in'], 'rows_out': None, 'peak_mb': None}
+    if baseline:
+        base['total'] = sum(base.values())
+
+    header = f"{'stage':<16}{'rows in':>10}{'rows out':>10}{'time, s':>10}{'peak, MB':>10}"
+    print(header + (f"{'base, s':>10}{'change':>9}" if baseline else ""))
+    for r in records + [total]:
+        line = (f"{r['stage']:<16}{_cell(r['rows_in'], ',')}{_cell(r['rows_out'], ',')}"
+                f"{_cell(r['seconds'], '.3f')}{_cell(r['peak_mb'], '.1f')}")
+        if baseline:
+            before = base.get(r['stage'])
+            change = (r['seconds'] / before - 1) * 100 if before else None
+            line += f"{_cell(before, '.3f')}{_cell(change, '+.0f', 8)}{'%' if change is not None else ' '}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--lf-format', choices=LF_FORMATS, default='percent')
+    parser.add_argument('--input', type=Path, help="реальная выгрузка вместо синтетической")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--memory', action='store_true', help="пик памяти по этапам через tracemalloc (замедляет прогон)")
+    parser.add_argument('--json', type=Path, help="сохранить результат в JSON")
+    parser.add_argument('--compare', type=Path, help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    path = args.input or ensure_export(args.rows, args.seed, args.lf_format)
+    today = date.today()
+    runs = [run_stages(path, today, args.memory) for _ in range(args.repeat)]
+    records = best_of([stages for stages, _ in runs])
+    prepare_peak = max((peak for _, peak in runs), default=None) if args.memory else None
+
+    commit = git_commit()
+    print(f"file={path.name} commit={commit} repeat={args.repeat} (лучшее время)")
+    baseline = json.loads(args.compare.read_text(encoding='utf-8')) if args.compare else None
+    if baseline:
+        print(f"baseline: commit={baseline.get('commit')} file={baseline.get('file')}")
+    print_report(records, baseline)
+    if prepare_peak is not None:
+        print(f"prepare_result: пик памяти {prepare_peak:.1f} МБ")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            'commit': commit, 'file': path.name, 'rows': records[0]['rows_out'],
+            'analysis_date': today.isoformat(), 'repeat': args.repeat, 'stages': records,
+            'prepare_peak_mb': prepare_peak,
+        }, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Генератор синтетических выгрузок в формате отчёта: flt_date&num, LF, Av fare, Cap, Av seats, Ind SS...
+
+Данные «грязные», как в реальных файлах: часть чисел записана текстом (неразрывные пробелы, десятичные
+запятые), LF со знаком % или долей 0..1, пропуски Av seats, битые даты и уже вылетевшие рейсы.
+
+Пример:  python benchmarks/generate_data.py --rows 100000 --out benchmarks/data/export_100k.xlsx
+"""
+import argparse
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+COLUMNS = ['flt_date&num', 'LF', 'Av fare', 'Cap', 'Av seats', 'Ind SS', 'Ind SS today', 'Ind SS yesterday']
+LF_FORMATS = ['percent', 'fraction', 'number']
+CARRIERS = ['SU', 'DP', 'S7', 'U6', 'FV']
+AIRPORTS = ['MOW', 'LED', 'AER', 'KZN', 'SVX', 'OVB', 'KRR', 'KGD', 'UFA', 'MRV', 'IKT', 'VVO']
+CAPACITIES = np.array([76, 100, 144, 150, 158, 180, 189, 227, 296, 402])
+TEXT_SHARE = 0.3   # доля ячеек Cap, Av seats и Ind SS yesterday, записанных текстом
+
+
+def _with_nbsp(values: np.ndarray) -> list:
+    """Числа как в выгрузке: '4 039' с неразрывным пробелом между тысячами."""
+    return [f"{v:,}".replace(',', '\u00a0') for v in values]
+
+
+def _as_text(values: np.ndarray, rng: np.random.Generator, share: float = TEXT_SHARE) -> np.ndarray:
+    """Доля share чисел — текстом, как в выгрузке: '3,0' с десятичной запятой или с неразрывным пробелом
+    впереди (выравнивание) и между тысячами. Остальные остаются числами — колонка получается смешанной."""
+    out = values.astype(object)
+    text = np.flatnonzero(rng.random(len(values)) < share)
+    comma = rng.random(len(text)) < 0.5
+    for i, use_comma in zip(text, comma):
+        out[i] = f"{values[i]},0" if use_comma else '\u00a0' + _with_nbsp([values[i]])[0]
+    return out
+
+
+def generate_export(rows: int, seed: int = 0, today: date | None = None, lf_format: str = 'percent') -> pd.DataFrame:
+    """Синтетическая выгрузка на rows строк; lf_format — 'percent' ('98,7%'), 'fraction' ('0,987') или 'number'."""
+    rng = np.random.default_rng(seed)
+    today = today or date.today()
+
+    routes = np.array([f"{a}-{b}" for a in AIRPORTS for b in AIRPORTS if a != b])
+    # Большая часть рейсов — ближайшие недели, немного уже в прошлом
+    offsets = np.minimum(rng.geometric(1 / 25, rows) - 4, 180)
+    day_labels = {d: (today + timedelta(days=int(d))).strftime('%Y.%m.%d') for d in np.unique(offsets)}
+    numbers = rng.integers(1, 9999, rows)
+    flights = [
+        f"{day_labels[d]} - {CARRIERS[n % len(CARRIERS)]}{n} - {routes[n % len(routes)]}"
+        for d, n in zip(offsets, numbers)
+    ]
+    # ~0.5% строк с битой датой
+    for i in rng.choice(rows, size=rows // 200, replace=False):
+        flights[i] = "н/д - " + flights[i].split(" - ", 1)[1]
+
+    cap = rng.choice(CAPACITIES, rows)
+    # Чем ближе вылет, тем выше загрузка
+    fill = np.clip(rng.beta(2, 3, rows) + (180 - offsets) / 600, 0, 1)
+    sold = np.round(cap * fill).astype(int)
+    blocks = (rng.random(rows) < 0.1) * rng.integers(0, 10, rows)
+    av_seats = np.clip(cap - sold - blocks, 0, None)
+    # Вчерашние продажи колеблются вокруг нужного темпа: кто-то отстаёт, кто-то перепродаёт
+    pace = av_seats / np.maximum(offsets, 1) * rng.lognormal(0, 0.7, rows)
+    yesterday = rng.poisson(np.maximum(pace, 0.2))
+    lf = sold / cap
+
+    if lf_format == 'percent':
+        lf_values = [f"{v:.1f}%".replace('.', ',') for v in lf * 100]
+    elif lf_format == 'fraction':
+        lf_values = [f"{v:.3f}".replace('.', ',') for v in lf]
+    else:
+        lf_values = list(np.round(lf * 100, 1))
+
+    av_seats_values = _as_text(av_seats, rng)
+    av_seats_values[rng.random(rows) < 0.01] = None   # пропуски Av seats
+
+    return pd.DataFrame({
+        'flt_date&num': flights,
+        'LF': lf_values,
+        'Av fare': _with_nbsp(rng.integers(1500, 45000, rows)),
+        'Cap': _as_text(cap, rng),
+        'Av seats': av_seats_values,
+        'Ind SS': sold,
+        'Ind SS today': rng.integers(0, 5, rows),
+        'Ind SS yesterday': _as_text(yesterday, rng),
+    }, columns=COLUMNS)
+
+
+def write_xlsx(frame: pd.DataFrame, path: Path):
+    """Пишет выгрузку через xlsxwriter в режиме constant_memory — 1M строк не требуют гигабайтов памяти."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    workbook = xlsxwriter.Workbook(str(path), {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Report')
+    worksheet.write_row(0, 0, frame.columns.tolist())
+    for row, values in enumerate(frame.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row, 0, [None if isinstance(v, float) and np.isnan(v) else v for v in values])
+    workbook.close()
+
+
+def ensure_export(rows: int, seed: int = 0, lf_format: str = 'percent', data_dir: Path = Path(__file__).parent / "data") -> Path:
+    """Путь к синтетической выгрузке нужного размера; файл генерируется один раз на дату."""
+    path = data_dir / f"export_{rows}_{seed}_{lf_format}_{date.today():%Y%m%d}.xlsx"
+    if not path.exists():
+        write_xlsx(generate_export(rows, seed, lf_format=lf_format), path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000, help="число строк (1k..1M)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--lf-format', choices=LF_FORMATS, default='percent')
+    parser.add_argument('--out', type=Path, required=True, help="куда писать .xlsx")
+    args = parser.parse_args()
+    if not 1 <= args.rows <= 1_048_575:
+        parser.error("в листе Excel помещается не больше 1 048 575 строк данных")
+    write_xlsx(generate_export(args.rows, args.seed, lf_format=args.lf_format), args.out)
+    print(f"✅ {args.out}: {args.rows:,} строк")
+
+
+if __name__ == '__main__':
+    main()
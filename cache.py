@@ -0,0 +1,68 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+
+
+def content_key(data: bytes | list, today: date) -> tuple:
+    """Ключ кэша: sha256 содержимого файла и дата анализа (days_to_flight зависит от сегодняшней даты).
+
+    Для нескольких файлов — sha256 от хэшей файлов в порядке загрузки (от порядка зависит, какой дубликат останется).
+    """
+    if isinstance(data, (bytes, bytearray)):
+        return hashlib.sha256(data).hexdigest(), today.isoformat()
+    digests = b"".join(hashlib.sha256(part).digest() for part in data)
+    return hashlib.sha256(digests).hexdigest(), today.isoformat()
+
+
+def derived_key(dataset_key: tuple, *parts) -> tuple:
+    """Ключ производного результата набора данных (отчёт, куб, пороги): parts вставляются перед датой анализа.
+
+    Дата остаётся последней — по ней ResultCache выбрасывает записи за прошлые дни.
+    """
+    return (*dataset_key[:-1], *parts, dataset_key[-1])
+
+
+class ResultCache:
+    """Потокобезопасный LRU-кэш подготовленных данных с ключами вида (хэш, дата анализа).
+
+    При обращении с новой датой все записи за прошлые дни выбрасываются, поэтому после полуночи
+    файл пересчитывается, а память под вчерашние результаты освобождается.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, day: str):
+        stale = [key for key in self._entries if key[-1] != day]
+        for key in stale:
+            del self._entries[key]
+
+    def get(self, key: tuple):
+        with self._lock:
+            self._expire(key[-1])
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value):
+        with self._lock:
+            self._expire(key[-1])
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_build(self, key: tuple, build):
+        """Значение по ключу; при промахе вызывает build() (вне блокировки) и кладёт результат в кэш."""
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.put(key, value)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# ----------------------- STATUSES --------------------------
+STATUS_OVERSELL = "🔵 Перепродажа"
+STATUS_ON_PLAN = "🟢 По плану"
+STATUS_LAGGING = "🔴 Отстаём"
+STATUSES = [STATUS_OVERSELL, STATUS_ON_PLAN, STATUS_LAGGING]
+
+
+# ----------------------- THRESHOLDS ------------------------
+@dataclass(frozen=True)
+class Thresholds:
+    """Пороги правил классификации; значения по умолчанию — исходная логика. Хэшируемые: входят в ключи кэшей."""
+    small_plan: float = 3             # малый план: daily_needed < ...
+    small_plan_oversell: float = 10   # малый план + огромные продажи: diff_vs_plan > ...
+    full_load_factor: float = 90      # полный рейс: LF > ... при нуле продаж вчера
+    far_days: float = 30              # далёкий рейс: days_to_flight > ...
+    far_small_plan: float = 4         # ... и daily_needed < ...
+    tolerance_min: float = 5          # допуск max(tolerance_min, tolerance_share * daily_needed)
+    tolerance_share: float = 0.3
+
+
+DEFAULT_THRESHOLDS = Thresholds()
+
+
+def classify_codes(days_to_flight, daily_needed, diff_vs_plan, load_factor, sold_yesterday,
+                   thresholds: Thresholds = DEFAULT_THRESHOLDS) -> np.ndarray:
+    """Классифицирует все рейсы разом по массивам NumPy: int8-коды статусов в STATUSES.
+
+    Правила и порядок приоритетов как в построчном classify; пороги — из thresholds.
+    """
+    t = thresholds
+    days_to_flight = np.asarray(days_to_flight, dtype=float)
+    daily_needed = np.asarray(daily_needed, dtype=float)
+    diff = np.asarray(diff_vs_plan, dtype=float)
+    load_factor = np.asarray(load_factor, dtype=float)
+    sold_yesterday = np.asarray(sold_yesterday, dtype=float)
+
+    small_plan = daily_needed < t.small_plan
+    far_small = (days_to_flight > t.far_days) & (daily_needed < t.far_small_plan)
+    # fmax, а не maximum: как и max(5, x) в Python, при NaN возвращает tolerance_min
+    tolerance = np.fmax(t.tolerance_min, daily_needed * t.tolerance_share)
+
+    # np.select берёт первое выполненное условие — это и есть порядок веток if/return
+    conditions = [
+        small_plan & (diff > t.small_plan_oversell),                    # 1. Малый план + огромные продажи
+        (sold_yesterday == 0) & (load_factor > t.full_load_factor),     # 2. Полный рейс
+        small_plan,                                                     # 3. Малый план
+        far_small & (sold_yesterday > daily_needed),                    # 4. Далёкие рейсы с малым планом
+        far_small,
+        diff > tolerance,                                               # 5. Основная классификация
+        np.abs(diff) <= tolerance,
+    ]
+    oversell, on_plan, lagging = (STATUSES.index(s) for s in (STATUS_OVERSELL, STATUS_ON_PLAN, STATUS_LAGGING))
+    choices = [
+        oversell,
+        on_plan,
+        on_plan,
+        oversell,
+        on_plan,
+        oversell,
+        on_plan,
+    ]
+    return np.select(conditions, choices, default=lagging).astype(np.int8)
+
+
+def classify_status(days_to_flight, daily_needed, diff_vs_plan, load_factor, sold_yesterday,
+                    thresholds: Thresholds = DEFAULT_THRESHOLDS) -> np.ndarray:
+    """То же, что classify_codes, но массив строк-статусов."""
+    codes = classify_codes(days_to_flight, daily_needed, diff_vs_plan, load_factor, sold_yesterday, thresholds)
+    return np.asarray(STATUSES)[codes]
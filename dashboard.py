@@ -0,0 +1,172 @@
+import math
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from cache import derived_key
+from classification import STATUS_LAGGING, STATUS_ON_PLAN, STATUS_OVERSELL, STATUSES
+
+STATUS_COLORS = {
+    STATUS_OVERSELL: "#1f77b4",
+    STATUS_ON_PLAN: "#2ca02c",
+    STATUS_LAGGING: "#d62728",
+}
+LF_BIN = 10              # ширина корзины Load Factor на графике распределения, %
+LF_PREFIX = 'lf_'        # колонки куба с числом рейсов в корзине LF: lf_0, lf_10, ...
+# Измерения куба — те, по которым фильтрует блок «🔍 Фильтры» (кроме LF) и строятся графики.
+# days_to_flight однозначно задаётся датой вылета, поэтому в ключ не входит, а переносится в ячейку
+ROLLUP_KEYS = ['route', 'flight_date', 'status']
+ROLLUP_MEASURES = ['remaining_seats', 'daily_needed', 'sold_yesterday']
+MEASURE_LABELS = {
+    'remaining_seats': "Осталось мест",
+    'daily_needed': "Необходимый темп",
+    'sold_yesterday': "Продано вчера",
+}
+MAX_ROUTES = 25          # остальные маршруты сворачиваются в «Прочие»
+MAX_DATE_POINTS = 120    # больше точек — даты группируются в интервалы по несколько дней
+
+
+# ----------------------- ROLLUPS ---------------------------
+def build_rollup(result: pd.DataFrame) -> pd.DataFrame:
+    """Куб по маршруту, дате вылета и статусу: число рейсов, суммы мест и темпов и рейсы по корзинам LF.
+
+    Строится один раз на набор данных; фильтры и графики дальше работают с кубом, а не с рейсами.
+    Load Factor ключом не делаем: с ним куб снова вырождается почти в рейс на ячейку, поэтому
+    распределение LF хранится колонками lf_<корзина> в тех же ячейках.
+    """
+    lf = result['load_factor_num'].to_numpy(dtype=np.float64)
+    frame = pd.DataFrame({
+        'route': result['route'],
+        'flight_date': result['flight_date'],
+        'status': result['status'],
+        'days_to_flight': result['days_to_flight'],
+        'lf_bin': np.floor(lf / LF_BIN) * LF_BIN,
+        # суммы считаем в 64 битах: float32 копит ошибку, int16 переполняется
+        **{m: result[m].to_numpy(dtype=np.float64) for m in ROLLUP_MEASURES},
+    })
+    cube = frame.groupby(ROLLUP_KEYS, observed=True, sort=False).agg(
+        flights=('remaining_seats', 'size'),
+        days_to_flight=('days_to_flight', 'first'),
+        **{m: (m, 'sum') for m in ROLLUP_MEASURES},
+    )
+    bins = frame.groupby([*ROLLUP_KEYS, 'lf_bin'], observed=True, sort=False).size().unstack('lf_bin', fill_value=0)
+    bins = bins.reindex(columns=sorted(bins.columns))
+    bins.columns = [f"{LF_PREFIX}{int(b)}" for b in bins.columns]
+    return cube.join(bins).fillna({c: 0 for c in bins.columns}).reset_index()
+
+
+def cached_rollup(cache, dataset_key: tuple, result: pd.DataFrame) -> pd.DataFrame:
+    """Куб из кэша по ключу набора данных; строится при первом обращении."""
+    return cache.get_or_build(derived_key(dataset_key, 'rollup'), lambda: build_rollup(result))
+
+
+def filter_rollup(cube: pd.DataFrame, filtered: pd.DataFrame, statuses, days_range: tuple, routes,
+                  load_factor_narrowed: bool) -> pd.DataFrame:
+    """Те же фильтры, что filter_result, но по ячейкам куба: статус, дни до вылета и маршрут.
+
+    Load Factor в кубе есть только корзинами, точно отфильтровать по нему ячейки нельзя: если диапазон LF сужен,
+    куб пересобирается по уже отфильтрованным рейсам filtered. Без сужения LF рейсы не перебираются.
+    """
+    if load_factor_narrowed:
+        return build_rollup(filtered)
+    return cube[
+        (cube['status'].isin(statuses)) &
+        (cube['days_to_flight'].between(days_range[0], days_range[1])) &
+        (cube['route'].isin(routes))
+    ]
+
+
+def status_mix(cube: pd.DataFrame) -> pd.Series:
+    """Число рейсов по статусам в порядке STATUSES (без пустых)."""
+    counts = cube.groupby('status', observed=True)['flights'].sum()
+    return counts.reindex([s for s in STATUSES if s in counts.index])
+
+
+def lf_distribution(cube: pd.DataFrame) -> pd.DataFrame:
+    """Число рейсов по корзинам LF (шаг LF_BIN) и статусам: строки — корзины, колонки — статусы."""
+    columns = [c for c in cube.columns if c.startswith(LF_PREFIX)]
+    distribution = cube.groupby('status', observed=True)[columns].sum().T
+    distribution.index = pd.Index([int(c[len(LF_PREFIX):]) for c in columns], name='lf_bin')
+    distribution.columns.name = 'status'
+    # после фильтра часть корзин пустеет — на графике их нет, как и корзин без рейсов вообще
+    return distribution[distribution.sum(axis=1) > 0].astype(np.int64)
+
+
+def route_totals(cube: pd.DataFrame, max_routes: int = MAX_ROUTES) -> pd.DataFrame:
+    """Суммы по маршрутам, больше всего оставшихся мест — сверху; хвост сворачивается в одну строку «Прочие»."""
+    totals = cube.groupby('route', observed=True)[ROLLUP_MEASURES].sum()
+    totals = totals.sort_values('remaining_seats', ascending=False)
+    totals.index = totals.index.astype(str)
+    if len(totals) > max_routes:
+        rest = totals.iloc[max_routes - 1:]
+        totals = pd.concat([totals.iloc[:max_routes - 1],
+                            rest.sum().to_frame(f"Прочие ({len(rest)})").T])
+    return totals
+
+
+def date_totals(cube: pd.DataFrame, max_points: int = MAX_DATE_POINTS) -> tuple:
+    """Суммы по датам вылета, не больше max_points точек: (таблица, дней в одной точке).
+
+    Суммы аддитивны, поэтому прореживание — это сумма по интервалам из нескольких дней, итоги не меняются.
+    """
+    daily = cube.groupby('flight_date')[ROLLUP_MEASURES].sum().sort_index()
+    if daily.empty:
+        return daily, 1
+    span = (daily.index[-1] - daily.index[0]).days + 1
+    step = max(1, math.ceil(span / max_points))
+    if step == 1:
+        return daily, 1
+    first = daily.index[0]
+    buckets = first + pd.to_timedelta((daily.index - first).days // step * step, unit='D')
+    return daily.groupby(buckets).sum(), step
+
+
+# ----------------------- FIGURES ---------------------------
+def status_mix_figure(mix: pd.Series) -> go.Figure:
+    fig = go.Figure(go.Pie(
+        labels=mix.index, values=mix.to_numpy(), hole=0.5, sort=False,
+        marker_colors=[STATUS_COLORS.get(s, "#7f7f7f") for s in mix.index],
+    ))
+    fig.update_layout(title="Статусы рейсов", margin=dict(t=40, b=10, l=10, r=10))
+    return fig
+
+
+def lf_distribution_figure(distribution: pd.DataFrame) -> go.Figure:
+    fig = go.Figure([
+        # столбец — корзина целиком: от lf_bin до lf_bin + LF_BIN
+        go.Bar(x=distribution.index + LF_BIN / 2, y=distribution[status], width=LF_BIN, name=status,
+               marker_color=STATUS_COLORS.get(status))
+        for status in STATUSES if status in distribution.columns
+    ])
+    fig.update_layout(title="Распределение Load Factor", barmode='stack', bargap=0,
+                      xaxis_title="Load Factor, %", yaxis_title="Рейсов", margin=dict(t=40, b=10, l=10, r=10))
+    return fig
+
+
+def route_figure(totals: pd.DataFrame) -> go.Figure:
+    """Темп по маршрутам: нужный против вчерашнего; оставшиеся места — в подсказке."""
+    fig = go.Figure([
+        go.Bar(y=totals.index, x=totals[m], name=MEASURE_LABELS[m], orientation='h',
+               customdata=totals['remaining_seats'], hovertemplate="%{x:.1f}<br>Осталось мест: %{customdata:,.0f}")
+        for m in ('daily_needed', 'sold_yesterday')
+    ])
+    fig.update_layout(title="Темп по маршрутам (больше всего свободных мест — сверху)", barmode='group',
+                      yaxis=dict(autorange='reversed'), height=max(350, 22 * len(totals)),
+                      margin=dict(t=40, b=10, l=10, r=10))
+    return fig
+
+
+def date_figure(totals: pd.DataFrame, step: int) -> go.Figure:
+    """Суммы по датам вылета: темпы — на левой оси, оставшиеся места — на правой."""
+    fig = go.Figure([
+        go.Scatter(x=totals.index, y=totals[m], name=MEASURE_LABELS[m], mode='lines')
+        for m in ('daily_needed', 'sold_yesterday')
+    ])
+    fig.add_trace(go.Scatter(x=totals.index, y=totals['remaining_seats'], name=MEASURE_LABELS['remaining_seats'],
+                             mode='lines', line=dict(dash='dot'), yaxis='y2'))
+    title = "По датам вылета" + (f" (суммы по {step} дн.)" if step > 1 else "")
+    fig.update_layout(title=title, yaxis=dict(title="Мест в день"),
+                      yaxis2=dict(title="Осталось мест", overlaying='y', side='right', showgrid=False),
+                      legend=dict(orientation='h', y=-0.15), margin=dict(t=40, b=10, l=10, r=10))
+    return fig
@@ -0,0 +1,105 @@
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+
+logger = logging.getLogger("sales_speed.stages")
+
+try:
+    _PAGE_MB = os.sysconf('SC_PAGE_SIZE') / 2**20
+except (AttributeError, ValueError, OSError):  # не Linux/Unix
+    _PAGE_MB = None
+
+
+def configure_logging(level: str | None = None):
+    """Строки замеров в stderr; уровень — SALES_LOG_LEVEL (INFO по умолчанию). Повторный вызов ничего не меняет."""
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(level or os.environ.get("SALES_LOG_LEVEL", "INFO"))
+    logger.propagate = False
+
+
+def rss_mb() -> float | None:
+    """Текущий RSS процесса в МБ по /proc/self/statm — дёшево, без tracemalloc; вне Linux — None."""
+    if _PAGE_MB is None:
+        return None
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_MB
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _rows(value) -> int | None:
+    return len(value) if isinstance(value, pd.DataFrame) else None
+
+
+def _logfmt(value) -> str:
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    text = str(value)
+    return f'"{text}"' if ' ' in text or '=' in text else text
+
+
+@dataclass
+class StageRecord:
+    """Замер одного этапа; memory_delta_mb — прирост RSS (может быть отрицательным после сборки мусора)."""
+    stage: str
+    seconds: float = 0.0
+    rows_in: int | None = None
+    rows_out: int | None = None
+    memory_delta_mb: float | None = None
+
+    def log_line(self, context: dict) -> str:
+        """Одна строка key=value (logfmt) — удобно грепать и разбирать."""
+        return " ".join(f"{key}={_logfmt(value)}" for key, value in {**asdict(self), **context}.items())
+
+
+class StageLog:
+    """Замеры этапов одного прогона: время, строки на входе и выходе, прирост памяти; каждый пишется в лог.
+
+    Именованные поля context попадают в каждую строку лога, чтобы отличать загрузки: StageLog(upload=..., files=2).
+    max_records ограничивает журнал последними замерами — для долгоживущих журналов вроде выгрузок за сессию.
+    """
+
+    def __init__(self, max_records: int | None = None, **context):
+        self.context = context
+        self.records = deque(maxlen=max_records)
+
+    @contextmanager
+    def track(self, stage: str, rows_in: int | None = None):
+        """with log.track('read') as record: ... record.rows_out = len(df)"""
+        record = StageRecord(stage, rows_in=rows_in)
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - start
+            rss_after = rss_mb()
+            if rss_before is not None and rss_after is not None:
+                record.memory_delta_mb = rss_after - rss_before
+            self.records.append(record)
+            logger.info(record.log_line(self.context))
+
+    def run(self, stage: str, func, *args, **kwargs):
+        """Замеряет func(*args, **kwargs); строки считаются по DataFrame в первом аргументе и в результате."""
+        with self.track(stage, _rows(args[0]) if args else None) as record:
+            value = func(*args, **kwargs)
+            record.rows_out = _rows(value)
+        return value
+
+    def frame(self) -> pd.DataFrame:
+        """Таблица замеров для панели диагностики."""
+        frame = pd.DataFrame([asdict(r) for r in self.records],
+                             columns=['stage', 'seconds', 'rows_in', 'rows_out', 'memory_delta_mb'])
+        return frame.astype({'rows_in': 'Int64', 'rows_out': 'Int64', 'memory_delta_mb': 'float64'})
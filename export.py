@@ -0,0 +1,85 @@
+import io
+
+import pandas as pd
+import xlsxwriter
+
+from cache import derived_key
+from pipeline import DATE_DISPLAY_FORMAT, widen_column
+
+EXPORT_FORMATS = {
+    'xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    'csv': "text/csv",
+    'parquet': "application/vnd.apache.parquet",
+}
+EXPORT_COLUMNS = [
+    'flight', 'flight_date', 'flight_number', 'route',
+    'total_seats', 'sold_total', 'sold_yesterday',
+    'remaining_seats', 'days_to_flight', 'daily_needed',
+    'diff_vs_plan', 'status', 'load_factor'
+]
+SHEET_NAME = 'Sales_Speed'
+XLSX_CHUNK_ROWS = 10_000
+
+
+def report_frame(result: pd.DataFrame, display_dates: bool = True) -> pd.DataFrame:
+    """Таблица отчёта из result: load_factor в процентах, дата ДД.ММ.ГГГГ или datetime.
+
+    Компактные типы result расширяются обратно (int64/float64, статус — строка), схема отчёта прежняя.
+    """
+    # Числа в result уже без NaN и округлены в prepare_result
+    columns = {c: widen_column(c, result[c]) for c in EXPORT_COLUMNS if c in result.columns}
+    # ✅ Изменено: формат даты на ДД.ММ.ГГГГ в экспорте
+    columns['flight_date'] = result['flight_date_display'] if display_dates else result['flight_date']
+    columns['load_factor'] = widen_column('load_factor_num', result['load_factor_num'])
+    return pd.DataFrame({c: columns[c] for c in EXPORT_COLUMNS})
+
+
+def to_xlsx(frame: pd.DataFrame) -> bytes:
+    """Пишет xlsx в режиме constant_memory: строки уходят во временный файл, в памяти держится одна."""
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    worksheet = workbook.add_worksheet(SHEET_NAME)
+    # Заголовок в том же стиле, что у pandas.to_excel
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    worksheet.write_row(0, 0, frame.columns.tolist(), header_format)
+
+    # constant_memory требует писать строго по строкам — идём блоками, NaN превращаем в пустые ячейки
+    row = 1
+    for start in range(0, len(frame), XLSX_CHUNK_ROWS):
+        chunk = frame.iloc[start:start + XLSX_CHUNK_ROWS].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        for values in chunk.itertuples(index=False, name=None):
+            worksheet.write_row(row, 0, values)
+            row += 1
+    workbook.close()
+    return output.getvalue()
+
+
+def to_csv(frame: pd.DataFrame) -> bytes:
+    return frame.to_csv(index=False).encode('utf-8')
+
+
+def to_parquet(frame: pd.DataFrame) -> bytes:
+    output = io.BytesIO()
+    frame.to_parquet(output, index=False)
+    return output.getvalue()
+
+
+def build_report(result: pd.DataFrame, fmt: str) -> bytes:
+    """Собирает отчёт в нужном формате; в Parquet дата остаётся типизированной для downstream-задач."""
+    if fmt == 'xlsx':
+        return to_xlsx(report_frame(result))
+    if fmt == 'csv':
+        return to_csv(report_frame(result))
+    if fmt == 'parquet':
+        return to_parquet(report_frame(result, display_dates=False))
+    raise ValueError(f"Неизвестный формат отчёта: {fmt}")
+
+
+def cached_report(cache, dataset_key: tuple, result: pd.DataFrame, fmt: str) -> bytes:
+    """Отчёт из кэша по ключу набора данных; собирается только при первом запросе формата."""
+    return cache.get_or_build(derived_key(dataset_key, fmt), lambda: build_report(result, fmt))
+
+
+def report_file_name(today, fmt: str) -> str:
+    return f"sales_speed_analysis_{today.strftime(DATE_DISPLAY_FORMAT)}.{fmt}"
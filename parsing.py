@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype, is_bool_dtype, is_numeric_dtype
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # без pyarrow работает обычный путь через pd.to_numeric
+    pa = None
+
+# Значения object-колонки, которые уже являются числами (openpyxl отдаёт int/float)
+_NUMERIC_KINDS = {'integer', 'floating', 'mixed-integer-float', 'empty'}
+_NUMBER_STRIP = ('\u00a0', ' ')
+_PERCENT_STRIP = ('%', '\u00a0', ' ')
+# Строки, которые Arrow разбирает так же, как pd.to_numeric
+_PLAIN_NUMBER = r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$'
+_PLAIN_INTEGER = r'^[+-]?\d+$'
+
+
+def _arrow_to_numeric(arr) -> np.ndarray:
+    """Разбирает строки через Arrow: простые числа — кастом, остальные ячейки — pd.to_numeric(errors='coerce')."""
+    plain = pc.fill_null(pc.match_substring_regex(arr, _PLAIN_NUMBER), False)
+    values = pc.if_else(plain, arr, None).cast(pa.float64()).to_numpy(zero_copy_only=False)
+
+    rest = ~plain.to_numpy(zero_copy_only=False) & arr.is_valid().to_numpy(zero_copy_only=False)
+    if rest.any():
+        # "н/д", "inf", "1_000" и прочее разбирает pandas, как и раньше
+        values[rest] = pd.to_numeric(arr.filter(pa.array(rest)).to_pandas(), errors='coerce').to_numpy(dtype=float)
+    # Как pd.to_numeric: только целые без пропусков -> int64, напрямую из строк, без потерь через float64
+    elif arr.null_count == 0 and pc.all(pc.match_substring_regex(arr, _PLAIN_INTEGER)).as_py():
+        try:
+            return arr.cast(pa.int64()).to_numpy()
+        except pa.ArrowInvalid:
+            # не помещается в int64 — тип (uint64 или float64) выбирает pd.to_numeric, как раньше
+            return pd.to_numeric(arr.to_pandas(), errors='coerce').to_numpy()
+    return values
+
+
+def _parse(s: pd.Series, strip: tuple) -> pd.Series:
+    """Общий разбор: числа берём как есть, строки чистим от разделителей и переводим в числа."""
+    # Колонка уже числовая — строковая обработка не нужна (bool как в исходной логике уходит в NaN)
+    if is_numeric_dtype(s.dtype) and not is_bool_dtype(s.dtype):
+        return pd.to_numeric(s)
+    if infer_dtype(s, skipna=True) in _NUMERIC_KINDS:
+        return pd.to_numeric(s, errors='coerce')
+
+    strings = s.astype(str)
+    if pa is None:
+        for ch in strip:
+            strings = strings.str.replace(ch, '', regex=False)
+        return pd.to_numeric(strings.str.replace(',', '.', regex=False), errors='coerce')
+
+    arr = pa.array(strings.array, type=pa.string())
+    for ch in strip:
+        arr = pc.replace_substring(arr, ch, '')
+    arr = pc.replace_substring(arr, ',', '.')
+    return pd.Series(_arrow_to_numeric(arr), index=s.index, name=s.name)
+
+
+def clean_number(s: pd.Series) -> pd.Series:
+    """Парсит числа: убирает пробелы/неразрывные пробелы, заменяет запятую на точку, возвращает float."""
+    return _parse(s, _NUMBER_STRIP)
+
+
+def clean_percent(s: pd.Series, by: pd.Series | None = None) -> pd.Series:
+    """Парсит проценты: снимает %, чистит разделители и масштабирует при необходимости (0..1 -> *100).
+
+    by — метка исходного файла: решение о масштабе принимается для каждого файла отдельно.
+    """
+    val = _parse(s, _PERCENT_STRIP)
+    # Если среднее по столбцу похоже на долю (например 0.92), домножаем на 100.
+    # Порог 2 работает устойчиво и к редким аномалиям.
+    if by is None:
+        return val * 100 if val.mean(skipna=True) < 2 else val
+    means = val.groupby(by, sort=False).transform('mean')
+    return val.where(~(means < 2), val * 100)
@@ -0,0 +1,413 @@
+import io
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from datetime import date
+from operator import itemgetter
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from classification import DEFAULT_THRESHOLDS, STATUSES, Thresholds, classify_codes
+from diagnostics import StageLog
+from parsing import clean_number, clean_percent
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # без pyarrow рейсы разбираются через pandas .str.split
+    pa = None
+
+# ----------------------- COLUMNS ---------------------------
+COLUMN_RENAMES = {
+    'flt_date&num': 'flight',
+    'Ind SS': 'sold_total_raw',          # как в файле (без блоков), дальше не используем в расчётах
+    'Ind SS yesterday': 'sold_yesterday',
+    'Cap': 'total_seats',
+    'LF': 'load_factor',
+}
+REQUIRED_COLUMNS = ['flight', 'sold_total_raw', 'sold_yesterday', 'total_seats', 'load_factor', 'Av seats']
+# Что реально идёт в расчёт: остальные колонки отбрасываются сразу после загрузки
+ANALYSIS_COLUMNS = [c for c in REQUIRED_COLUMNS if c != 'sold_total_raw']
+# Номер файла при загрузке нескольких выгрузок: формат LF (доли или проценты) у файлов может различаться
+SOURCE_COLUMN = 'source'
+RESULT_COLUMNS = [
+    'flight', 'flight_date', 'flight_number', 'route',
+    'total_seats', 'sold_total', 'sold_yesterday',
+    'remaining_seats', 'days_to_flight', 'daily_needed',
+    'diff_vs_plan', 'load_factor_num', 'status'
+]
+DATE_DISPLAY_FORMAT = '%d.%m.%Y'
+# Компактная модель result: счётчики — int16/int32, темпы и LF — float32 (округлены до 0.1), статус — категория
+COUNT_COLUMNS = ['total_seats', 'sold_total', 'sold_yesterday', 'remaining_seats', 'days_to_flight']
+RATE_COLUMNS = ['daily_needed', 'diff_vs_plan', 'load_factor_num']
+STATUS_DTYPE = pd.CategoricalDtype(STATUSES)
+# Неокруглённые входы классификации (float64), которые хранятся рядом с result для пересчёта порогов
+CLASSIFICATION_INPUTS = ['daily_needed', 'diff_vs_plan', 'load_factor_num', 'sold_yesterday']
+
+
+class PipelineError(Exception):
+    """Ошибка во входных данных: текст показывается пользователю как есть, анализ прерывается."""
+
+    def __init__(self, message: str, found_columns: list | None = None):
+        super().__init__(message)
+        self.found_columns = found_columns
+
+
+@dataclass
+class PreparedData:
+    """Результат подготовки файла: итоговая таблица, превью исходных данных и сообщения для UI."""
+    result: pd.DataFrame
+    preview: pd.DataFrame
+    notices: list = field(default_factory=list)   # [(уровень st.*, текст), ...] в порядке появления
+    stage_log: StageLog | None = None             # замеры этапов подготовки, если их вели
+    inputs: dict = field(default_factory=dict)     # {колонка: float64} из CLASSIFICATION_INPUTS, строки как в result
+
+
+# ----------------------- LOADING ---------------------------
+# Исходные имена нужных колонок: читаем из файла только их
+SOURCE_COLUMNS = [{v: k for k, v in COLUMN_RENAMES.items()}.get(c, c) for c in REQUIRED_COLUMNS]
+
+
+def _column_array(values: list) -> np.ndarray:
+    """Собирает типизированный массив колонки: числа — сразу в int64/float64, остальное — object."""
+    if set(map(type, values)) <= {int, float, type(None)}:
+        arr = np.array(values, dtype=float)
+        # как pd.read_excel: целые числа без пропусков остаются int64
+        if not np.isnan(arr).any() and (arr == np.trunc(arr)).all():
+            return arr.astype(np.int64)
+        return arr
+    return np.array(values, dtype=object)
+
+
+def load_workbook(source) -> pd.DataFrame:
+    """Читает первый лист Excel-выгрузки (путь или файловый объект), только нужные для анализа колонки.
+
+    Лист читается потоково (read_only): openpyxl всё равно разбирает каждую ячейку строки,
+    но в DataFrame попадают только колонки из SOURCE_COLUMNS, остальные значения сразу отбрасываются.
+    """
+    wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise PipelineError("❌ Файл пустой")
+
+        # Те же имена и та же ошибка, что и у pd.read_excel + rename
+        header = [h if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+        renamed = [COLUMN_RENAMES.get(h, h) for h in header]
+        missing_columns = [c for c in REQUIRED_COLUMNS if c not in renamed]
+        if missing_columns:
+            if not any(row.count(None) != len(row) for row in rows):
+                raise PipelineError("❌ Файл пустой")
+            raise PipelineError(
+                f"❌ Отсутствуют обязательные колонки: {', '.join(missing_columns)}",
+                found_columns=renamed,
+            )
+
+        # Позиции — по тем же переименованным заголовкам, что и проверка выше: файл с внутренними именами
+        # (flight вместо flt_date&num) принимается, как и у read_excel + rename; колонки названы по SOURCE_COLUMNS
+        positions = [renamed.index(c) for c in REQUIRED_COLUMNS]
+        width = len(header)
+        pick = itemgetter(*positions)
+        # Как read_excel: пустые строки внутри листа остаются строками из NaN (и попадают в счётчики отброшенных),
+        # отрезаются только пустые строки в конце листа
+        data = []
+        filled = 0
+        for row in rows:
+            data.append(pick(row if len(row) >= width else row + (None,) * (width - len(row))))
+            if row.count(None) != len(row):
+                filled = len(data)
+        del data[filled:]
+    finally:
+        wb.close()
+
+    if not data:
+        raise PipelineError("❌ Файл пустой")
+    columns = zip(*data)
+    return pd.DataFrame({name: _column_array(list(values)) for name, values in zip(SOURCE_COLUMNS, columns)})
+
+
+def _load_bytes(data: bytes) -> pd.DataFrame:
+    """Точка входа для процессов пула: читает выгрузку из байтов."""
+    return load_workbook(io.BytesIO(data))
+
+
+def load_workbooks(files: list, executor: Executor | None = None) -> tuple:
+    """Читает несколько выгрузок [(имя, байты), ...] параллельно и объединяет их в один DataFrame.
+
+    Рейс (flt_date&num), уже встретившийся в одном из предыдущих файлов, отбрасывается;
+    возвращает объединённый DataFrame (для нескольких файлов — с колонкой source, номером файла) и сообщения для UI.
+    """
+    if executor is None or len(files) == 1:
+        results = [_load_bytes(data) for _, data in files]
+    else:
+        futures = [executor.submit(_load_bytes, data) for _, data in files]
+        results = []
+        for (name, _), future in zip(files, futures):
+            try:
+                results.append(future.result())
+            except PipelineError as e:
+                raise PipelineError(f"{e} (файл: {name})", found_columns=e.found_columns) from e
+
+    if len(results) == 1:
+        return results[0], []
+
+    notices = []
+    df = pd.concat(results, keys=range(len(results)), names=[SOURCE_COLUMN, None]).reset_index(level=SOURCE_COLUMN)
+    # Оставляем рейс из первого файла, где он встретился; дубли внутри одного файла не трогаем.
+    # Строки без ключа (пустые строки листа) рейсами не считаются — их отбросит разбор дат
+    key = df['flt_date&num']
+    first_source = df.groupby(key, sort=False, dropna=False)[SOURCE_COLUMN].transform('min')
+    duplicates = (df[SOURCE_COLUMN] != first_source) & key.notna()
+    if duplicates.any():
+        notices.append(("warning", f"⚠️ {int(duplicates.sum())} рейсов встречаются в нескольких файлах — "
+                                   "оставлены строки из первого по порядку загрузки файла."))
+        df = df[~duplicates]
+    notices.append(("info", f"ℹ️ Объединено файлов: {len(results)}, строк: {len(df)}"))
+    # Метка файла остаётся до разбора LF — масштаб (доли/проценты) определяется по каждому файлу
+    return df.reset_index(drop=True), notices
+
+
+# ----------------------- PIPELINE --------------------------
+def _split_flight(flight: pd.Series) -> list:
+    """Части 'дата - номер - маршрут' как у .str.split(n=2, expand=True); недостающие части — пропуски.
+
+    Строковую колонку режет Arrow: без списков Python-строк на каждую ячейку.
+    """
+    if pa is None or not isinstance(flight.dtype, pd.StringDtype):
+        parts = flight.str.split(" - ", n=2, expand=True)
+        return [parts[i] for i in parts.columns]
+    lists = pc.split_pattern(pa.array(flight.array, type=pa.string()), " - ", max_splits=2)
+    lengths = pc.list_value_length(lists)
+    width = pc.max(lengths).as_py() or 0
+    return [
+        pd.Series(pc.list_element(pc.if_else(pc.greater_equal(lengths, i + 1), lists, None), i).to_pandas(),
+                  index=flight.index)
+        for i in range(width)
+    ]
+
+
+def parse_flight_keys(flight: pd.Series) -> pd.DataFrame:
+    """Разбирает 'YYYY.MM.DD - XX123 - ROUTE' одним векторным проходом.
+
+    Возвращает flight_date (datetime64, NaT при ошибке), flight_number и route (категории),
+    а также flight_date_display — дату в виде ДД.ММ.ГГГГ для таблицы, блока внимания и экспорта.
+    """
+    parts = _split_flight(flight)
+    if len(parts) < 3:
+        raise PipelineError("❌ Неверный формат 'flt_date&num'. Ожидается: 'YYYY.MM.DD - XX123 - ROUTE'")
+
+    flight_date = pd.to_datetime(parts[0], format="%Y.%m.%d", errors='coerce')
+    # Различных дат в выгрузке немного: strftime только для уникальных, остальное — коды категории
+    codes, uniques = pd.factorize(flight_date)
+    date_display = pd.Categorical.from_codes(codes, categories=uniques.strftime(DATE_DISPLAY_FORMAT))
+
+    return pd.DataFrame({
+        'flight_date': flight_date,
+        'flight_number': parts[1].astype('category'),
+        'route': parts[2].astype('category'),
+        'flight_date_display': date_display,
+    }, index=flight.index)
+
+
+# ----------------------- STAGES ----------------------------
+# Каждый этап: (df, дата анализа, список сообщений) -> df. Порядок — в PIPELINE_STAGES.
+def split_flights(df: pd.DataFrame, today: date, notices: list) -> pd.DataFrame:
+    """Разбор flt_date&num и исключение строк с некорректной датой."""
+    df = df.join(parse_flight_keys(df['flight']))
+
+    original_count = len(df)
+    invalid_dates = df['flight_date'].isna().sum()
+    if invalid_dates > 0:
+        notices.append(("warning", f"⚠️ Найдено {invalid_dates} строк с некорректной датой. Они будут исключены."))
+        df = df[df['flight_date'].notna()]
+    if df.empty:
+        raise PipelineError("❌ После обработки дат не осталось корректных записей")
+    notices.append(("success", f"✅ Обработано {len(df)} из {original_count} записей"))
+    return df
+
+
+def clean_numbers(df: pd.DataFrame, today: date, notices: list) -> pd.DataFrame:
+    """Очистка числовых колонок и исключение строк без Av seats."""
+    df['total_seats']     = clean_number(df['total_seats'])
+    df['sold_yesterday']  = clean_number(df['sold_yesterday']).fillna(0)
+    df['av_seats']        = clean_number(df['Av seats'])  # оставляем NaN для контроля
+    df['load_factor_num'] = clean_percent(df['load_factor'], by=df.get(SOURCE_COLUMN)).fillna(0)   # ✅ всегда 0..100
+    # Сырые строки после разбора не нужны — дальше фильтры копируют только числа
+    df = df.drop(columns=['Av seats', 'load_factor'])
+
+    # ---------- Require Av seats ----------
+    if df['av_seats'].isna().any():
+        missing = int(df['av_seats'].isna().sum())
+        notices.append(("warning", f"⚠️ У {missing} строк нет 'Av seats' — они исключены (нужно для учёта блоков)."))
+        df = df[df['av_seats'].notna()]
+    if df.empty:
+        raise PipelineError("❌ После исключения строк без 'Av seats' не осталось данных")
+    return df
+
+
+def add_days_to_flight(df: pd.DataFrame, today: date, notices: list) -> pd.DataFrame:
+    """Дни до вылета относительно даты анализа и исключение уже вылетевших рейсов."""
+    # Даты рейсов — полночь без времени, поэтому разница в днях точная
+    analysis_day = pd.Timestamp(today)
+    df['days_to_flight'] = (df['flight_date'] - analysis_day).dt.days.clip(lower=1)
+
+    # Убираем уже вылетевшие
+    is_past = df['flight_date'] < analysis_day
+    if is_past.any():
+        notices.append(("warning", f"⚠️ Найдено {int(is_past.sum())} рейсов, которые уже вылетели. Они будут исключены."))
+        df = df[~is_past]
+    if df.empty:
+        raise PipelineError("❌ После исключения вылетевших рейсов не осталось записей")
+    return df
+
+
+def add_sales_plan(df: pd.DataFrame, today: date, notices: list) -> pd.DataFrame:
+    """sold_total, остаток мест, необходимый дневной темп и отклонение от него."""
+    # ---------- NEW sold_total & remaining ----------
+    # sold_total включает жёсткие блоки: Cap - Av seats
+    df['sold_total']      = (df['total_seats'] - df['av_seats']).clip(lower=0)
+    # остаток мест равен Av seats
+    df['remaining_seats'] = df['av_seats'].clip(lower=0)
+
+    # ---------- Daily plan & diffs ----------
+    df['daily_needed'] = np.where(
+        (df['days_to_flight'] > 0) & (df['remaining_seats'] > 0),
+        df['remaining_seats'] / df['days_to_flight'],
+        0
+    )
+    df['diff_vs_plan'] = df['sold_yesterday'] - df['daily_needed']
+    return df
+
+
+def classification_inputs(df: pd.DataFrame) -> dict:
+    """Входы классификации до округления и сужения типов: {колонка: float64}."""
+    return {c: df[c].to_numpy(dtype=np.float64) for c in CLASSIFICATION_INPUTS}
+
+
+def classify_inputs(days_to_flight, inputs: dict, thresholds: Thresholds = DEFAULT_THRESHOLDS) -> pd.Categorical:
+    """Статусы категорией по days_to_flight и входам из classification_inputs."""
+    codes = classify_codes(
+        days_to_flight,
+        inputs['daily_needed'],
+        inputs['diff_vs_plan'],
+        inputs['load_factor_num'],
+        inputs['sold_yesterday'],
+        thresholds,
+    )
+    # Коды сразу становятся категорией — без промежуточного массива строк на каждую строку
+    return pd.Categorical.from_codes(codes, dtype=STATUS_DTYPE)
+
+
+def classify_flights(df: pd.DataFrame, today: date, notices: list) -> pd.DataFrame:
+    """Классификация (УПРОЩЕННАЯ ЛОГИКА - БЕЗ "ДАЛЕКО ДО РЕЙСА")."""
+    # Векторно по столбцам: правила и приоритеты — в classification.classify_codes
+    df['status'] = classify_inputs(df['days_to_flight'].to_numpy(), classification_inputs(df))
+    return df
+
+
+def _compact_count(values: pd.Series) -> np.ndarray:
+    """Счётчик в наименьшем подходящем целом типе; дробные значения или пропуски (редкость) остаются float64."""
+    arr = values.to_numpy(dtype=np.float64)
+    if np.isnan(arr).any() or (arr != np.trunc(arr)).any():
+        return arr
+    int16 = np.iinfo(np.int16)
+    fits_int16 = arr.size == 0 or (int16.min <= arr.min() and arr.max() <= int16.max)
+    return arr.astype(np.int16 if fits_int16 else np.int32)
+
+
+def widen_column(name: str, values: pd.Series) -> pd.Series:
+    """Колонка result в прежнем широком типе: счётчики — int64, темпы — float64 с округлением до 0.1, статус — строка.
+
+    Для отчётов и истории снимков: там важны привычная схема и значения без хвостов float32 (12.300000190734863).
+    """
+    if name in COUNT_COLUMNS and values.dtype.kind == 'i':
+        return values.astype(np.int64)
+    if name in RATE_COLUMNS:
+        return values.astype(np.float64).round(1)
+    if name == 'status':
+        return values.astype(str)
+    return values
+
+
+def build_result(df: pd.DataFrame, today: date, notices: list) -> pd.DataFrame:
+    """Итоговый набор колонок с округлением для показа и экспорта, в компактных типах.
+
+    Классификация уже посчитана во float64, поэтому сужение типов на статусы не влияет.
+    """
+    # ---------- Formatting ----------
+    columns = {c: df[c] for c in RESULT_COLUMNS + ['flight_date_display']}
+    columns['sold_yesterday']   = df['sold_yesterday'].fillna(0).round(1)
+    columns['sold_total']       = df['sold_total'].fillna(0).round(0)
+    columns['remaining_seats']  = df['remaining_seats'].fillna(0).round(0)
+    for c in COUNT_COLUMNS:
+        columns[c] = _compact_count(columns[c])
+    for c in RATE_COLUMNS:
+        columns[c] = df[c].fillna(0).round(1).to_numpy(dtype=np.float32)
+    # Строки исходного файла больше не нужны по номерам — RangeIndex не занимает памяти
+    return pd.DataFrame(columns).reset_index(drop=True)
+
+
+PIPELINE_STAGES = [
+    ('split/dates', split_flights),
+    ('clean', clean_numbers),
+    ('days to flight', add_days_to_flight),
+    ('plan math', add_sales_plan),
+    ('classify', classify_flights),
+    ('result', build_result),
+]
+
+
+def rename_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Переименование колонок выгрузки и проверка обязательных."""
+    df = df.rename(columns=COLUMN_RENAMES)
+    missing_columns = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing_columns:
+        raise PipelineError(
+            f"❌ Отсутствуют обязательные колонки: {', '.join(missing_columns)}",
+            found_columns=df.columns.tolist(),
+        )
+    return df
+
+
+def prepare_result(df: pd.DataFrame, today: date, stage_log: StageLog | None = None) -> PreparedData:
+    """Готовит итоговую таблицу: переименование, даты, очистка чисел, план продаж и классификация.
+
+    Со stage_log каждый этап из PIPELINE_STAGES замеряется (время, строки, память).
+    """
+    notices = []
+    df = rename_columns(df)
+    preview = df.drop(columns=SOURCE_COLUMN, errors='ignore').head()
+    df = df[ANALYSIS_COLUMNS + [c for c in [SOURCE_COLUMN] if c in df.columns]]
+    inputs = {}
+    for name, stage in PIPELINE_STAGES:
+        if stage is build_result:
+            # До округления и float32: пересчёт порогов идёт по тем же числам, что и основная классификация
+            inputs = classification_inputs(df)
+        if stage_log is None:
+            df = stage(df, today, notices)
+        else:
+            df = stage_log.run(name, stage, df, today, notices)
+    return PreparedData(result=df, preview=preview, notices=notices, stage_log=stage_log, inputs=inputs)
+
+
+def reclassify(prepared: PreparedData, thresholds: Thresholds) -> pd.Categorical:
+    """Статусы result при других порогах: только classify_codes по сохранённым входам, без загрузки и очистки."""
+    return classify_inputs(prepared.result['days_to_flight'].to_numpy(), prepared.inputs, thresholds)
+
+
+def compare_statuses(before: pd.Categorical, after: pd.Categorical) -> pd.DataFrame:
+    """Сводка «было → стало»: число рейсов по статусам, разница и сколько рейсов ушло в каждый статус."""
+    n = len(STATUSES)
+    moves = np.bincount(before.codes.astype(np.int64) * n + after.codes, minlength=n * n).reshape(n, n)
+    table = pd.DataFrame(moves, index=STATUSES, columns=[f"→ {s}" for s in STATUSES])
+    table.insert(0, 'Было', moves.sum(axis=1))
+    table.insert(1, 'Стало', moves.sum(axis=0))
+    table.insert(2, 'Δ', table['Стало'] - table['Было'])
+    return table
+
+
+def analyze_file(source, today: date) -> PreparedData:
+    """Полный анализ одной выгрузки без UI: загрузка, очистка, фильтр дат, план продаж и классификация."""
+    return prepare_result(load_workbook(source), today)
@@ -0,0 +1,38 @@
+import pandas as pd
+import streamlit as st
+
+CHECK_COLUMN = "✅"
+
+
+def init_review_state(dataset_key: tuple, result: pd.DataFrame):
+    """Готовит состояние проверки рейсов: множество отмеченных flight и счётчики отмеченных по статусам.
+
+    Счётчики пересчитываются один раз при смене набора данных, дальше только обновляются в apply_review_edits.
+    """
+    if 'checked_flights' not in st.session_state:
+        st.session_state.checked_flights = set()
+        st.session_state.review_version = 0
+    if st.session_state.get('review_dataset') != dataset_key:
+        checked = result[result['flight'].isin(st.session_state.checked_flights)]
+        st.session_state.checked_counts = checked['status'].value_counts().to_dict()
+        st.session_state.review_dataset = dataset_key
+
+
+def apply_review_edits(editor_key: str, flights: list, status: str):
+    """Колбэк data_editor: переносит отметки страницы в checked_flights пачкой и сдвигает счётчик статуса."""
+    checked = st.session_state.checked_flights
+    delta = 0
+    for position, changes in st.session_state[editor_key]["edited_rows"].items():
+        if CHECK_COLUMN not in changes:
+            continue
+        flight = flights[int(position)]
+        if changes[CHECK_COLUMN] and flight not in checked:
+            checked.add(flight)
+            delta += 1
+        elif not changes[CHECK_COLUMN] and flight in checked:
+            checked.discard(flight)
+            delta -= 1
+    counts = st.session_state.checked_counts
+    counts[status] = counts.get(status, 0) + delta
+    # Новая версия ключа — редактор перерисуется уже с сохранёнными отметками и пустой историей правок
+    st.session_state.review_version += 1
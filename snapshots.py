@@ -0,0 +1,156 @@
+import os
+import threading
+import uuid
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from pipeline import widen_column
+
+SNAPSHOT_DIR = Path(os.environ.get("SALES_SNAPSHOT_DIR", "snapshots"))
+SNAPSHOT_SCHEMA = pa.schema([
+    ('flight', pa.string()),
+    ('flight_date', pa.timestamp('ms')),
+    ('flight_number', pa.string()),
+    ('route', pa.string()),
+    ('status', pa.string()),
+    ('sold_yesterday', pa.float64()),
+    ('daily_needed', pa.float64()),
+    ('diff_vs_plan', pa.float64()),
+    ('load_factor_num', pa.float64()),
+    ('remaining_seats', pa.int64()),
+    ('days_to_flight', pa.int64()),
+])
+# Каталоги вида analysis_date=2024-01-15 — дата снимка берётся из пути, по ней отсекаются файлы
+PARTITIONING = ds.partitioning(pa.schema([('analysis_date', pa.date32())]), flavor='hive')
+
+
+class SnapshotStore:
+    """Локальное колоночное хранилище снимков анализа: Parquet-файлы по датам анализа, ключ — (дата, flight)."""
+
+    def __init__(self, root: Path = SNAPSHOT_DIR):
+        self.root = Path(root)
+        self._ranges = {}
+        # Хранилище одно на все сессии Streamlit: проверка «уже сохранено» и запись идут под замком
+        self._lock = threading.Lock()
+
+    def _partition(self, analysis_date: date) -> Path:
+        return self.root / f"analysis_date={analysis_date.isoformat()}"
+
+    def dates(self) -> list:
+        """Даты, за которые есть снимки (только по именам каталогов)."""
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            date.fromisoformat(p.name.split("=", 1)[1])
+            for p in self.root.glob("analysis_date=*") if any(p.glob("*.parquet"))
+        )
+
+    def append(self, analysis_date: date, result: pd.DataFrame) -> int:
+        """Дописывает снимок за дату; рейсы, уже сохранённые за эту дату, пропускает. Возвращает число новых строк."""
+        with self._lock:
+            partition = self._partition(analysis_date)
+            parts = sorted(partition.glob("*.parquet"))
+            frame = pd.DataFrame({c: widen_column(c, result[c]) for c in SNAPSHOT_SCHEMA.names})
+            if parts:
+                stored = ds.dataset(parts, schema=SNAPSHOT_SCHEMA).to_table(columns=['flight'])['flight']
+                frame = frame[~frame['flight'].isin(stored.to_pylist())]
+            frame = frame.drop_duplicates('flight')
+            if frame.empty:
+                return 0
+
+            # Сортировка по flight даёт узкие min/max в row group — поиск рейса читает только нужные группы
+            table = pa.Table.from_pandas(
+                frame.astype({'flight_number': str, 'route': str}), preserve_index=False
+            ).cast(SNAPSHOT_SCHEMA).sort_by('flight')
+            partition.mkdir(parents=True, exist_ok=True)
+            # Уникальное имя: параллельная запись (другой процесс, batch.py) не перезапишет чужой файл.
+            # Временный файл начинается с точки — такие файлы ds.dataset и glob("*.parquet") не видят,
+            # поэтому недописанный или брошенный после сбоя файл не попадёт в выборки
+            target = partition / f"part-{uuid.uuid4().hex}.parquet"
+            tmp = partition / f".{target.stem}.tmp"
+            pq.write_table(table, tmp, row_group_size=2_048)
+            tmp.replace(target)
+            return len(frame)
+
+    def _files(self, start: date | None, end: date | None) -> list:
+        """Файлы снимков за диапазон дат анализа: [(дата, путь), ...]."""
+        return [
+            (day, path)
+            for day in self.dates()
+            if (start is None or day >= start) and (end is None or day <= end)
+            for path in sorted(self._partition(day).glob("*.parquet"))
+        ]
+
+    def _flight_ranges(self, path: Path) -> tuple:
+        """min/max flight по row group файла; файлы после записи не меняются, поэтому кэшируем."""
+        if path not in self._ranges:
+            meta = pq.ParquetFile(path).metadata
+            column = SNAPSHOT_SCHEMA.get_field_index('flight')
+            stats = [meta.row_group(i).column(column).statistics for i in range(meta.num_row_groups)]
+            self._ranges[path] = (np.array([s.min for s in stats], dtype=object),
+                                  np.array([s.max for s in stats], dtype=object))
+        return self._ranges[path]
+
+    def _read_flights(self, files: list, flights: list, columns: list) -> pa.Table:
+        """Читает только row group, в диапазон flight которых попадает хоть один искомый рейс."""
+        wanted = np.array(sorted(set(flights)), dtype=object)
+        value_set = pa.array(wanted, type=pa.string())
+        read_columns = list(dict.fromkeys([*columns, 'flight']))
+        tables = []
+        for day, path in files:
+            mins, maxs = self._flight_ranges(path)
+            pos = np.searchsorted(wanted, mins)
+            hit = pos < len(wanted)
+            hit[hit] = wanted[pos[hit]] <= maxs[hit]
+            if not hit.any():
+                continue
+            table = pq.ParquetFile(path).read_row_groups(np.flatnonzero(hit).tolist(), columns=read_columns)
+            table = table.filter(pc.is_in(table['flight'], value_set=value_set))
+            tables.append(table.append_column('analysis_date', pa.array([day] * table.num_rows, pa.date32())))
+        if not tables:
+            return pa.table({c: pa.array([], SNAPSHOT_SCHEMA.field(c).type) for c in read_columns}
+                            | {'analysis_date': pa.array([], pa.date32())})
+        return pa.concat_tables(tables)
+
+    def query(self, flights=None, routes=None, start: date | None = None, end: date | None = None,
+              columns: list | None = None) -> pd.DataFrame:
+        """Снимки по рейсам, маршрутам и диапазону дат анализа.
+
+        По рейсам читаются только нужные row group (индекс min/max flight), по маршрутам и датам
+        фильтр проталкивается в чтение Parquet, а каталоги вне диапазона дат не открываются.
+        """
+        columns = list(columns or SNAPSHOT_SCHEMA.names)
+        # route нужен для фильтра, даже если его не просили вернуть
+        read_columns = list(dict.fromkeys([*columns, *(['route'] if routes is not None else [])]))
+        files = self._files(start, end)
+
+        if flights is not None:
+            table = self._read_flights(files, list(flights), read_columns)
+            if routes is not None:
+                table = table.filter(pc.is_in(table['route'], value_set=pa.array(list(routes), pa.string())))
+        elif files:
+            condition = None
+            for expr in (
+                pc.field('route').isin(list(routes)) if routes is not None else None,
+                pc.field('analysis_date') >= pa.scalar(start, pa.date32()) if start else None,
+                pc.field('analysis_date') <= pa.scalar(end, pa.date32()) if end else None,
+            ):
+                if expr is not None:
+                    condition = expr if condition is None else condition & expr
+            # Только файлы *.parquet из _files: посторонние и временные файлы в каталогах не читаются
+            dataset = ds.dataset([str(path) for _, path in files], format="parquet",
+                                 partitioning=PARTITIONING, partition_base_dir=str(self.root))
+            table = dataset.to_table(columns=['analysis_date', *read_columns], filter=condition)
+        else:
+            return pd.DataFrame(columns=['analysis_date', *columns])
+
+        frame = table.select(['analysis_date', *columns]).to_pandas()
+        frame['analysis_date'] = pd.to_datetime(frame['analysis_date'])
+        return frame.sort_values(['analysis_date', *(['flight'] if 'flight' in columns else [])], ignore_index=True)
@@ -0,0 +1,78 @@
+import math
+
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZES = [25, 50, 100, 250]
+STATUS_ROW_COLORS = {
+    '🔴 Отстаём': 'background-color: #ffcccc',
+    '🔵 Перепродажа': 'background-color: #ccffcc',
+}
+
+
+def page_controls(key: str, total_rows: int, default_size: int = 50) -> slice:
+    """Выбор размера и номера страницы; возвращает срез строк текущей страницы."""
+    c1, c2, c3 = st.columns([1, 1, 2])
+    size = c1.selectbox("Строк на странице", PAGE_SIZES, index=PAGE_SIZES.index(default_size), key=f"{key}_size")
+    pages = max(1, math.ceil(total_rows / size))
+    # После смены фильтров страниц может стать меньше — поджимаем номер до создания виджета
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    page = c2.number_input("Страница", min_value=1, max_value=pages, value=1, step=1, key=page_key)
+    c3.caption(f"Страница {page} из {pages} · всего строк: {total_rows}")
+    start = (page - 1) * size
+    return slice(start, start + size)
+
+
+def sort_controls(key: str, options: dict, default: str) -> tuple:
+    """Выбор колонки и направления сортировки; options — {подпись: колонка}."""
+    c1, c2 = st.columns([3, 1])
+    labels = list(options)
+    label = c1.selectbox("Сортировать по", labels, index=labels.index(default), key=f"{key}_sort")
+    ascending = c2.toggle("По возрастанию", value=True, key=f"{key}_asc")
+    return options[label], ascending
+
+
+def sorted_page(df: pd.DataFrame, sort_by: str, ascending: bool, rows: slice) -> pd.DataFrame:
+    """Сортирует только индекс и материализует лишь строки текущей страницы."""
+    order = df[sort_by].sort_values(ascending=ascending, kind='stable').index
+    return df.loc[order[rows]]
+
+
+def filter_result(result: pd.DataFrame, statuses, days_range: tuple, routes, load_factor_range: tuple) -> pd.DataFrame:
+    """Фильтры из блока «🔍 Фильтры»: статусы, дни до вылета, маршруты и диапазон Load Factor."""
+    # Границы LF приводим к типу колонки (float32): округлённая граница 12.3 совпадает со значением 12.3 в данных
+    lf_type = result['load_factor_num'].dtype.type
+    return result[
+        (result['status'].isin(statuses)) &
+        (result['days_to_flight'].between(days_range[0], days_range[1])) &
+        (result['route'].isin(routes)) &
+        (result['load_factor_num'].between(lf_type(load_factor_range[0]), lf_type(load_factor_range[1])))
+    ]
+
+
+def results_page_frame(page_df: pd.DataFrame) -> pd.DataFrame:
+    """Колонки основной таблицы для страницы; числа остаются числами — формат задаёт column_config."""
+    return pd.DataFrame({
+        'flight': page_df['flight'],
+        # ✅ Изменено: формат даты на ДД.ММ.ГГГГ
+        'flight_date': page_df['flight_date_display'],
+        'flight_number': page_df['flight_number'],
+        'route': page_df['route'],
+        'total_seats': page_df['total_seats'],
+        'sold_total': page_df['sold_total'],
+        'sold_yesterday': page_df['sold_yesterday'],
+        'remaining_seats': page_df['remaining_seats'],
+        'days_to_flight': page_df['days_to_flight'],
+        'daily_needed': page_df['daily_needed'],
+        'diff_vs_plan': page_df['diff_vs_plan'],
+        'status': page_df['status'],
+        'load_factor': page_df['load_factor_num'],
+    })
+
+
+def highlight_status_rows(page: pd.DataFrame) -> pd.DataFrame:
+    """Цвет строк по статусу (Styler.apply с axis=None): одна map по колонке status для всей страницы."""
+    css = page['status'].astype(object).map(STATUS_ROW_COLORS).fillna('')
+    return pd.DataFrame({c: css for c in page.columns}, index=page.index)
@@ -0,0 +1,127 @@
+"""Эквивалентность векторной классификации и исходной построчной classify из app.py.
+
+Запуск:  python -m pytest -q test_classification.py
+"""
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from classification import DEFAULT_THRESHOLDS, STATUSES, Thresholds, classify_codes, classify_status
+
+NAN = float('nan')
+# Значения у каждой границы правил: 3, 4, 5, 10, 30, 90, допуск 0.3 * daily_needed (16.7 -> 5.01, 50 -> 15) и NaN
+DAYS = [1, 29, 30, 31, 120, NAN]
+DAILY_NEEDED = [0, 2.9, 3, 3.1, 3.9, 4, 4.1, 16.6, 16.7, 20, 50, NAN]
+DIFF = [-20, -15.1, -15, -6, -5.01, -5, -4.9, 0, 4.9, 5, 5.01, 5.1, 10, 10.1, 15, 15.1, NAN]
+LOAD_FACTOR = [0, 89.9, 90, 90.1, 100, NAN]
+SOLD_YESTERDAY = [0, 1, 3, 3.5, 4.5, NAN]
+
+
+def legacy_classify(row: dict) -> str:
+    """Копия исходной построчной classify (df.apply(classify, axis=1))."""
+    days_to_flight = row['days_to_flight']
+    daily_needed = row['daily_needed']
+    diff = row['diff_vs_plan']
+    load_factor = row['load_factor_num']
+    sold_yesterday = row['sold_yesterday']
+
+    # 1. Перепродажа для малых планов с огромными продажами
+    if daily_needed < 3 and diff > 10:
+        return "🔵 Перепродажа"
+
+    # 2. Полный рейс
+    if sold_yesterday == 0 and load_factor > 90:
+        return "🟢 По плану"
+
+    # 3. Малый план
+    if daily_needed < 3:
+        return "🟢 По плану"
+
+    # 4. Далёкие рейсы с малым планом - ТЕПЕРЬ "ПО ПЛАНУ"
+    if days_to_flight > 30 and daily_needed < 4:
+        if sold_yesterday > daily_needed:
+            return "🔵 Перепродажа"
+        else:
+            return "🟢 По плану"  # ВСЕ остальные случаи - по плану
+
+    # 5. Основная классификация
+    if diff > max(5, daily_needed * 0.3):
+        return "🔵 Перепродажа"
+    elif abs(diff) <= max(5, daily_needed * 0.3):
+        return "🟢 По плану"
+    else:
+        return "🔴 Отстаём"
+
+
+def thresholds_classify(row: dict, t: Thresholds) -> str:
+    """Та же построчная логика, но с порогами из t — эталон для нестандартных порогов."""
+    daily_needed, diff = row['daily_needed'], row['diff_vs_plan']
+    tolerance = max(t.tolerance_min, daily_needed * t.tolerance_share)
+    if daily_needed < t.small_plan and diff > t.small_plan_oversell:
+        return "🔵 Перепродажа"
+    if row['sold_yesterday'] == 0 and row['load_factor_num'] > t.full_load_factor:
+        return "🟢 По плану"
+    if daily_needed < t.small_plan:
+        return "🟢 По плану"
+    if row['days_to_flight'] > t.far_days and daily_needed < t.far_small_plan:
+        return "🔵 Перепродажа" if row['sold_yesterday'] > daily_needed else "🟢 По плану"
+    if diff > tolerance:
+        return "🔵 Перепродажа"
+    return "🟢 По плану" if abs(diff) <= tolerance else "🔴 Отстаём"
+
+
+@pytest.fixture(scope='module')
+def grid() -> dict:
+    rows = np.array(list(itertools.product(DAYS, DAILY_NEEDED, DIFF, LOAD_FACTOR, SOLD_YESTERDAY)), dtype=float)
+    names = ['days_to_flight', 'daily_needed', 'diff_vs_plan', 'load_factor_num', 'sold_yesterday']
+    return dict(zip(names, rows.T))
+
+
+def _rows(grid: dict):
+    names = list(grid)
+    return (dict(zip(names, values)) for values in zip(*(grid[n].tolist() for n in names)))
+
+
+def _vector_args(grid: dict) -> tuple:
+    return (grid['days_to_flight'], grid['daily_needed'], grid['diff_vs_plan'],
+            grid['load_factor_num'], grid['sold_yesterday'])
+
+
+def test_default_thresholds_match_legacy_constants():
+    assert Thresholds() == DEFAULT_THRESHOLDS
+    assert (DEFAULT_THRESHOLDS.small_plan, DEFAULT_THRESHOLDS.small_plan_oversell, DEFAULT_THRESHOLDS.full_load_factor,
+            DEFAULT_THRESHOLDS.far_days, DEFAULT_THRESHOLDS.far_small_plan,
+            DEFAULT_THRESHOLDS.tolerance_min, DEFAULT_THRESHOLDS.tolerance_share) == (3, 10, 90, 30, 4, 5, 0.3)
+
+
+def test_classify_status_matches_legacy(grid):
+    expected = [legacy_classify(row) for row in _rows(grid)]
+    assert classify_status(*_vector_args(grid)).tolist() == expected
+    assert classify_status(*_vector_args(grid), thresholds=Thresholds()).tolist() == expected
+
+
+def test_classify_codes_match_legacy(grid):
+    expected = [STATUSES.index(legacy_classify(row)) for row in _rows(grid)]
+    codes = classify_codes(*_vector_args(grid))
+    assert codes.dtype == np.int8
+    assert codes.tolist() == expected
+
+
+def test_nan_tolerance_falls_back_to_minimum():
+    # max(5, NaN) в Python даёт 5: при NaN daily_needed допуск остаётся 5
+    assert math.isnan(NAN * 0.3) and max(5, NAN * 0.3) == 5
+    status = classify_status([10], [NAN], [4.9], [50], [1])
+    assert status.tolist() == [legacy_classify(
+        {'days_to_flight': 10, 'daily_needed': NAN, 'diff_vs_plan': 4.9, 'load_factor_num': 50, 'sold_yesterday': 1})]
+
+
+@pytest.mark.parametrize('thresholds', [
+    Thresholds(small_plan=2, far_days=60),
+    Thresholds(full_load_factor=80, tolerance_min=3, tolerance_share=0.5),
+    Thresholds(small_plan_oversell=5, far_small_plan=10),
+])
+def test_custom_thresholds_match_rowwise(grid, thresholds):
+    expected = [thresholds_classify(row, thresholds) for row in _rows(grid)]
+    assert classify_status(*_vector_args(grid), thresholds=thresholds).tolist() == expected